@@ -2,10 +2,20 @@ from . import views
 
 from django.urls import path
 
+from core.db.replica import replica_read
+
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech'),
+    path(
+        'author/',
+        replica_read(views.AboutAuthorView.as_view()),
+        name='author'
+    ),
+    path(
+        'tech/',
+        replica_read(views.AboutTechView.as_view()),
+        name='tech'
+    ),
 ]
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        if settings.REPLICA_SYNC_INTERVAL:
+            from .db import replica
+            replica.start_sync_thread(settings.REPLICA_SYNC_INTERVAL)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Бэкенды, данные которых видны только своему процессу.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Без DEBUG версии кэша должны быть общими для всех процессов.
+
+    Проверка для ``manage.py check --deploy``: тесты идут без DEBUG,
+    но в одном процессе.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        'Кэш по умолчанию виден только своему процессу: сброс версий '
+        'страниц и карточек не дойдёт до других воркеров.',
+        hint='Укажите в CACHES общий кэш, например memcached.',
+        obj=backend,
+        id='core.E001',
+    )]
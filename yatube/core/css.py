@@ -0,0 +1,125 @@
+import os
+import re
+
+WORD = re.compile(r'[\w-]+')
+CLASS = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+# Атрибуты вроде [href$=".pdf"]: точка в значении — не класс.
+ATTRIBUTE = re.compile(
+    r'\[(?:"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[^\]])*\]'
+)
+NEGATION = ':not('
+# Скобки и точки с запятой вне строк и комментариев.
+TOKEN = re.compile(
+    r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{};]', re.S
+)
+# Внутри этих правил — обычные правила со своими селекторами.
+NESTED = ('@media', '@supports', '@document')
+
+
+def used_words(directories, extensions=('.html', '.js')):
+    """Все слова из файлов шаблонов и скриптов.
+
+    Среди них имена классов, в том числе подставленные шаблоном
+    или скриптом; лишние слова только оставляют лишние правила.
+    """
+    words = set()
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if not name.endswith(extensions):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, encoding='utf-8', errors='ignore') as file:
+                    words.update(WORD.findall(file.read()))
+    return words
+
+
+def blocks(css):
+    """Разбирает CSS верхнего уровня на (заголовок, тело или None).
+
+    Тело None у инструкций вида ``@charset "…";``. Комментарии между
+    правилами пропускаются, кроме лицензионных ``/*! … */``.
+    """
+    start, depth, prelude = 0, 0, None
+    for match in TOKEN.finditer(css):
+        token = match.group()
+        if token.startswith('/*'):
+            if depth == 0 and not css[start:match.start()].strip():
+                if token.startswith('/*!'):
+                    yield token, None
+                start = match.end()
+        elif token == '{':
+            if depth == 0:
+                prelude = css[start:match.start()].strip()
+                start = match.end()
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:match.start()]
+                start = match.end()
+        elif token == ';' and depth == 0:
+            yield css[start:match.end()].strip(), None
+            start = match.end()
+
+
+def selectors(prelude):
+    """Селекторы списка через запятую, не считая запятых в скобках."""
+    depth, start = 0, 0
+    for position, char in enumerate(prelude):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            yield prelude[start:position].strip()
+            start = position + 1
+    yield prelude[start:].strip()
+
+
+def selector_classes(selector):
+    """Классы, без которых селектор ничего не выбирает.
+
+    Классы внутри ``:not(...)`` не в счёт: если класс не используется,
+    отрицание верно всегда. Значения атрибутов тоже пропускаются.
+    """
+    selector = ATTRIBUTE.sub('', selector)
+    kept, position = [], 0
+    while True:
+        start = selector.find(NEGATION, position)
+        if start < 0:
+            kept.append(selector[position:])
+            break
+        kept.append(selector[position:start])
+        depth, position = 1, start + len(NEGATION)
+        while position < len(selector) and depth:
+            depth += {'(': 1, ')': -1}.get(selector[position], 0)
+            position += 1
+    return CLASS.findall(''.join(kept))
+
+
+def purge(css, used):
+    """CSS без правил, чьи селекторы ссылаются на неиспользуемые классы.
+
+    Селектор остаётся, если все его классы (см. selector_classes) есть
+    в ``used``; правило — если остался хоть один селектор. @media и
+    @supports чистятся изнутри, прочие @-правила не трогаются.
+    """
+    kept = []
+    for prelude, body in blocks(css):
+        if body is None:
+            kept.append(prelude)
+        elif prelude.startswith(NESTED):
+            inner = purge(body, used)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            kept.append(f'{prelude}{{{body}}}')
+        else:
+            alive = [
+                selector for selector in selectors(prelude)
+                if used.issuperset(selector_classes(selector))
+            ]
+            if alive:
+                kept.append(f'{",".join(alive)}{{{body}}}')
+    return ''.join(kept)
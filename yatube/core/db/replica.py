@@ -0,0 +1,184 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SYNCED_KEY = 'replica:synced_at'
+WRITTEN_KEY = 'replica:written_at'
+COOKIE = 'primary_after'
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_state = threading.local()
+
+
+def replica_read(view):
+    """Помечает view, которому можно читать из реплики."""
+    view.replica_read = True
+    return view
+
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE
+    return alias if alias in settings.DATABASES else None
+
+
+def current_alias():
+    """Алиас для чтений в текущем запросе."""
+    return getattr(_state, 'alias', DEFAULT_DB_ALIAS)
+
+
+def is_stale():
+    """Текущий запрос читает реплику, которая отстаёт от основной базы.
+
+    Собранное из такой реплики нельзя класть в кэш под текущими
+    версиями: запись уже сдвинула версии, и устаревшая страница
+    прожила бы до следующей записи. Отметка о записи читается заново
+    при каждом вызове: задача могла записать и сдвинуть версии уже
+    после начала запроса.
+    """
+    if current_alias() == DEFAULT_DB_ALIAS:
+        return False
+    synced = getattr(_state, 'synced', None)
+    if synced is None:
+        return True
+    return cache.get(WRITTEN_KEY, 0) >= synced
+
+
+def mark_written(at=None):
+    at = at or time.time()
+    cache.set(WRITTEN_KEY, at, None)
+    return at
+
+
+@contextmanager
+def track_writes(using=DEFAULT_DB_ALIAS):
+    """Отмечает записи в основную базу для проверки is_stale().
+
+    Отметка ставится до выполнения записи, раньше сдвига версий
+    кэша, и ещё раз после фиксации транзакции, когда запись видна
+    синхронизации. Отдаёт список, непустой, если запись была.
+    """
+    wrote = []
+
+    def detect_writes(execute, sql, params, many, context):
+        if not sql.lstrip()[:7].upper().startswith(WRITES):
+            return execute(sql, params, many, context)
+        wrote.append(True)
+        mark_written()
+        result = execute(sql, params, many, context)
+        transaction.on_commit(mark_written, using=using)
+        return result
+
+    with connections[using].execute_wrapper(detect_writes):
+        yield wrote
+
+
+def sync():
+    """Копирует основную базу SQLite в файл реплики через backup API.
+
+    Время отметки берётся до начала копирования: всё, что записано
+    раньше, в копию уже попало.
+    """
+    alias = replica_alias()
+    if alias is None:
+        return None
+    started = time.time()
+    copy_database(
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'],
+        settings.DATABASES[alias]['NAME']
+    )
+    cache.set(SYNCED_KEY, started, None)
+    return started
+
+
+def copy_database(source_path, target_path):
+    """Согласованный снимок базы: backup API не мешает писателям."""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def sync_forever(interval):
+    while True:
+        try:
+            sync()
+        except sqlite3.Error:
+            pass
+        time.sleep(interval)
+
+
+def start_sync_thread(interval):
+    thread = threading.Thread(
+        target=sync_forever, args=(interval,), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+class PrimaryReplicaRouter:
+    """Чтения помеченных view — из реплики, всё остальное — из основной."""
+
+    def db_for_read(self, model, **hints):
+        return current_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплика — копия основной базы и сама не мигрирует.
+        return db != replica_alias()
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтений запроса и следит за записями.
+
+    Реплика используется для view с ``replica_read``, если она хоть раз
+    синхронизирована и уже содержит последнюю запись этого клиента:
+    после записи клиент получает cookie со временем записи и читает
+    из основной базы, пока синхронизация его не догонит.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            with track_writes() as wrote:
+                response = self.get_response(request)
+        finally:
+            _state.alias = DEFAULT_DB_ALIAS
+            _state.synced = None
+        if wrote:
+            at = mark_written()
+            response.set_cookie(
+                COOKIE, repr(at), max_age=settings.REPLICA_STICKY_MAX_AGE
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        alias = replica_alias()
+        if alias is None or not getattr(view_func, 'replica_read', False):
+            return None
+        synced = cache.get(SYNCED_KEY)
+        if synced is None:
+            return None
+        try:
+            own_write = float(request.COOKIES.get(COOKIE, 0))
+        except ValueError:
+            own_write = 0
+        if own_write >= synced:
+            return None
+        _state.alias = alias
+        _state.synced = synced
+        return None
@@ -0,0 +1,41 @@
+from django.db.backends.sqlite3 import base
+
+# Значения по умолчанию; OPTIONS['pragmas'] в DATABASES их дополняет.
+PRAGMAS = {
+    # Читатели не блокируют писателя и не ждут его.
+    'journal_mode': 'WAL',
+    # В WAL данные не теряются при падении процесса, fsync — на чекпоинте.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+TIMEOUT = 20
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с WAL и настроенными PRAGMA на каждом соединении.
+
+    Ожидание блокировки задаётся OPTIONS['timeout'] в секундах.
+    Транзакции начинаются с BEGIN IMMEDIATE: писатель сразу берёт
+    блокировку записи и при занятой базе ждёт её в пределах таймаута,
+    а не падает с «database is locked» при переходе от чтения к записи
+    внутри уже открытой транзакции.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        params.setdefault('timeout', TIMEOUT)
+        self.pragmas.setdefault('busy_timeout', int(params['timeout'] * 1000))
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import (
+    DatabaseError, OperationalError, connections, router, transaction
+)
+from django.db.models import F, Q
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .db import replica
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+LOCK_RETRIES = 5
+LOCK_RETRY_DELAY = 0.05
+
+# Задачи JOBS_EAGER, отложенные до конца текущего HTTP-запроса.
+_request = threading.local()
+
+
+class Task:
+    """Функция, которую можно выполнить позже через очередь задач."""
+
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        """Выполняет задачу, отмечая её записи для реплики.
+
+        Задача пишет вне ReplicaMiddleware и после записи сдвигает
+        версии кэша; без отметки чтение реплики сочло бы её свежей и
+        положило старые данные под новые версии.
+        """
+        with replica.track_writes():
+            return self.func(*args, **kwargs)
+
+    def delay(self, *args, run_at=None, **kwargs):
+        """Ставит вызов в очередь в текущей транзакции.
+
+        Задача станет видна обработчику только после фиксации, а при
+        откате пропадёт вместе с записью, которая её породила. При
+        JOBS_EAGER вызов выполняется сразу, а внутри HTTP-запроса —
+        после отправки ответа, как если бы его сделал обработчик.
+        """
+        if settings.JOBS_EAGER:
+            deferred = getattr(_request, 'deferred', None)
+            if deferred is None:
+                return self.run(*args, **kwargs)
+            deferred.append((self, args, kwargs))
+            return None
+        return Job.objects.create(
+            name=self.name,
+            arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+            run_at=run_at or timezone.now(),
+            max_attempts=self.max_attempts
+        )
+
+
+@receiver(request_started)
+def defer_eager_tasks(sender, **kwargs):
+    _request.deferred = []
+
+
+@receiver(request_finished)
+def run_deferred_tasks(sender, **kwargs):
+    """Выполняет задачи JOBS_EAGER, отложенные за запрос.
+
+    Упавшая задача, как у обработчика, пишется в лог и не мешает
+    остальным.
+    """
+    deferred = getattr(_request, 'deferred', None) or []
+    _request.deferred = None
+    for delayed, call_args, call_kwargs in deferred:
+        try:
+            delayed.run(*call_args, **call_kwargs)
+        except Exception:
+            logger.exception('Задача %s упала', delayed.name)
+
+
+def task(func=None, *, max_attempts=None):
+    """Декоратор задачи: ``@task`` или ``@task(max_attempts=3)``."""
+    def decorator(func):
+        return Task(func, max_attempts or settings.JOBS_MAX_ATTEMPTS)
+    return decorator(func) if func is not None else decorator
+
+
+def backoff(attempts):
+    """Экспоненциальная пауза перед повтором со случайным разбросом."""
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY
+    )
+    return timedelta(seconds=delay * random.uniform(1, 1.5))
+
+
+def is_locked(error):
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def retry_locked(func, *args):
+    """Повторяет вызов, пока база занята другим писателем.
+
+    Такая ошибка не говорит о задаче ничего и не считается попыткой.
+    """
+    for attempt in range(1, LOCK_RETRIES + 1):
+        try:
+            return func(*args)
+        except OperationalError as error:
+            if not is_locked(error) or attempt == LOCK_RETRIES:
+                raise
+            time.sleep(LOCK_RETRY_DELAY * attempt)
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def claim(worker, batch_size):
+    """Забирает пачку готовых задач и помечает их своими.
+
+    Задачи, зависшие в работе дольше JOBS_LOCK_TIMEOUT (обработчик
+    упал), забираются снова. На SQLite транзакция записи начинается
+    с BEGIN IMMEDIATE и не пересекается с чужой выборкой; где база
+    умеет SKIP LOCKED, обработчики не ждут друг друга.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    using = router.db_for_write(Job)
+    with transaction.atomic(using=using):
+        due = (Job
+               .objects
+               .using(using)
+               .filter(
+                   Q(status=Job.QUEUED, run_at__lte=now)
+                   | Q(status=Job.RUNNING, locked_at__lt=stale)
+               )
+               .order_by('run_at', 'pk'))
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        Job.objects.using(using).filter(pk__in=ids).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1
+        )
+        return list(Job
+                    .objects
+                    .using(using)
+                    .filter(pk__in=ids)
+                    .order_by('run_at', 'pk'))
+
+
+def run(job):
+    """Выполняет задачу; успешная удаляется в той же транзакции.
+
+    Ошибка откатывает всё сделанное задачей, и она возвращается
+    в очередь с паузой или, исчерпав попытки, остаётся со статусом
+    failed и текстом ошибки.
+    """
+    if job.attempts > job.max_attempts:
+        # Обработчик с этой задачей падал каждый раз, не дойдя до конца.
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, locked_by='', locked_at=None
+        )
+        return False
+    try:
+        with transaction.atomic():
+            arguments = json.loads(job.arguments)
+            import_string(job.name).run(
+                *arguments['args'], **arguments['kwargs']
+            )
+            Job.objects.filter(pk=job.pk).delete()
+    except Exception as exception:
+        if is_locked(exception):
+            raise
+        error = traceback.format_exc()
+        logger.warning('Задача %s упала: %s', job, error)
+        failed = job.attempts >= job.max_attempts
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED if failed else Job.QUEUED,
+            run_at=timezone.now() + backoff(job.attempts),
+            locked_by='',
+            locked_at=None,
+            last_error=error
+        )
+        return False
+    return True
+
+
+def work(worker, batch_size=10, poll_interval=1.0, stop=None, once=False):
+    """Цикл обработчика: забирает пачки, пока не попросят остановиться.
+
+    С ``once`` выходит, как только готовых задач не осталось.
+    Возвращает число выполненных задач.
+    """
+    stop = stop or threading.Event()
+    done = 0
+    while not stop.is_set():
+        try:
+            jobs = retry_locked(claim, worker, batch_size)
+        except DatabaseError as error:
+            logger.warning('Обработчик %s не забрал задачи: %s', worker, error)
+            stop.wait(poll_interval)
+            continue
+        if not jobs:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+        for job in jobs:
+            try:
+                done += retry_locked(run, job)
+            except DatabaseError as error:
+                # Задача останется за обработчиком и вернётся в очередь
+                # по истечении JOBS_LOCK_TIMEOUT.
+                logger.warning('Задача %s не выполнена: %s', job, error)
+    return done
@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+MODES = (
+    ('stock', 'django.db.backends.sqlite3'),
+    ('tuned', 'core.db.sqlite3'),
+)
+
+READ_COMMENTS = 20
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(share * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает штатный бэкенд sqlite3 и core.db.sqlite3 под '
+        'одновременными чтениями страницы поста и записью комментариев. '
+        'Каждый режим работает со своей временной базой; читатели и '
+        'писатели — отдельные процессы, как воркеры сервера, поэтому '
+        'ждут они блокировок базы, а не GIL. В журнале отката читатель '
+        'ждёт писателя только на время его коммита, поэтому хвосты чтений '
+        'в режимах различаются умеренно; главный выигрыш WAL и BEGIN '
+        'IMMEDIATE — в задержке записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--hold-ms', type=float, default=5,
+            help='Сколько писатель держит транзакцию открытой.'
+        )
+        parser.add_argument('--comments', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"mode":<6} {"journal":>8} {"reads":>7} {"read p50":>9} '
+            f'{"read p99":>9} {"read max":>9} {"writes":>7} '
+            f'{"write p99":>10} {"errors":>7}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, engine in MODES:
+                self.stdout.write(self.run_mode(
+                    mode, engine, os.path.join(directory, f'{mode}.sqlite3'),
+                    options
+                ))
+
+    def run_mode(self, mode, engine, path, options):
+        alias = f'bench_sqlite_{mode}'
+        connections.databases[alias] = {
+            'ENGINE': engine,
+            'NAME': path,
+            'OPTIONS': {'timeout': 20},
+        }
+        # Процессы создаются через fork и наследуют настройки Django и
+        # псевдоним базы; открытые соединения им передавать нельзя.
+        context = multiprocessing.get_context('fork')
+        try:
+            post_id, author_id, journal = self.prepare(alias, options)
+            connections.close_all()
+            stop, results = context.Event(), context.Queue()
+            processes = [
+                context.Process(
+                    target=self.worker,
+                    args=(alias, self.read, (post_id,), results, stop)
+                )
+                for _ in range(options['readers'])
+            ] + [
+                context.Process(
+                    target=self.worker,
+                    args=(
+                        alias, self.write,
+                        (post_id, author_id, options['hold_ms'] / 1000),
+                        results, stop
+                    )
+                )
+                for _ in range(options['writers'])
+            ]
+            for process in processes:
+                process.start()
+            time.sleep(options['seconds'])
+            stop.set()
+            reads, writes, errors = [], [], []
+            # Очередь разбирается до join: процесс с непрочитанными
+            # данными в очереди не завершается.
+            for _ in processes:
+                action, timings, failures = results.get()
+                (reads if action == 'read' else writes).extend(timings)
+                errors.extend(failures)
+            for process in processes:
+                process.join()
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        return (
+            f'{mode:<6} {journal:>8} {len(reads):>7} '
+            f'{percentile(reads, 0.5):>9.2f} {percentile(reads, 0.99):>9.2f} '
+            f'{max(reads, default=0):>9.2f} {len(writes):>7} '
+            f'{percentile(writes, 0.99):>10.2f} {len(errors):>7}'
+        )
+
+    def prepare(self, alias, options):
+        """Схема нужных таблиц и пост с комментариями.
+
+        Строки вставляются через bulk_create: сигналы приложения
+        работают с основной базой и сюда писать не должны.
+        """
+        with connections[alias].schema_editor() as editor:
+            for model in (User, Group, Post, Comment):
+                editor.create_model(model)
+        author = User(username='bench_author')
+        User.objects.using(alias).bulk_create([author])
+        author = User.objects.using(alias).get(username='bench_author')
+        Post.objects.using(alias).bulk_create(
+            [Post(author=author, text='Пост')]
+        )
+        post = Post.objects.using(alias).get()
+        Comment.objects.using(alias).bulk_create(
+            Comment(post=post, author=author, text=f'Комментарий {i}')
+            for i in range(options['comments'])
+        )
+        with connections[alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal = cursor.fetchone()[0]
+        return post.pk, author.pk, journal
+
+    def worker(self, alias, action, args, results, stop):
+        """Цикл одного процесса; замеры уходят в ``results`` в конце."""
+        timings, errors = [], []
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    action(alias, *args)
+                except OperationalError as error:
+                    errors.append(str(error))
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections[alias].close()
+            results.put((action.__name__, timings, errors))
+
+    def read(self, alias, post_id):
+        """Запросы страницы поста: сам пост и последние комментарии.
+
+        Число комментариев ограничено, чтобы время чтения не росло
+        вместе с числом записанных за прогон.
+        """
+        Post.objects.using(alias).select_related('author').get(pk=post_id)
+        list(Comment
+             .objects
+             .using(alias)
+             .filter(post_id=post_id)
+             .select_related('author')
+             .order_by('-created')[:READ_COMMENTS])
+
+    def write(self, alias, post_id, author_id, hold):
+        """Запись комментария со счётчиком, как в add_comment."""
+        with transaction.atomic(using=alias):
+            Comment.objects.using(alias).bulk_create([
+                Comment(post_id=post_id, author_id=author_id, text='Новый')
+            ])
+            Post.objects.using(alias).filter(pk=post_id).update(
+                comment_count=F('comment_count') + 1
+            )
+            time.sleep(hold)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файл реплики. Отметка времени '
+        'синхронизации хранится в кэше, поэтому процессы сайта должны '
+        'видеть тот же кэш; с локальным кэшем в памяти используйте '
+        'REPLICA_SYNC_INTERVAL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять синхронизацию каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if replica.replica_alias() is None:
+            raise CommandError('Реплика не описана в DATABASES.')
+        if options['interval']:
+            replica.sync_forever(options['interval'])
+        replica.sync()
+        self.stdout.write(self.style.SUCCESS('Реплика синхронизирована.'))
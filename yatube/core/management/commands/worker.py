@@ -0,0 +1,99 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def run_threads(threads, options, stop):
+    """Запускает потоки обработчиков и ждёт их завершения."""
+    done = []
+
+    def target(index):
+        try:
+            done.append(jobs.work(
+                jobs.worker_name(index),
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                stop=stop,
+                once=options['once']
+            ))
+        finally:
+            connections.close_all()
+
+    pool = [
+        threading.Thread(target=target, args=(index,), daemon=True)
+        for index in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            thread.join()
+    except KeyboardInterrupt:
+        # Потоки дорабатывают текущую пачку, задачи не теряются.
+        stop.set()
+        for thread in pool:
+            thread.join()
+    return sum(done)
+
+
+def run_process(threads, options):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    return run_threads(threads, options, stop)
+
+
+class Command(BaseCommand):
+    help = (
+        'Обработчик очереди задач core.jobs: каждый поток забирает '
+        'готовые задачи пачками и выполняет их, упавшие повторяются '
+        'с экспоненциальной паузой. Останавливается по Ctrl+C или '
+        'SIGTERM, дорабатывая текущую пачку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Число потоков в каждом процессе.'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов; больше одного — через fork.'
+        )
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда готовых задач нет.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] == 1:
+            done = run_process(options['threads'], options)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=run_process, args=(options['threads'], options)
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # Ctrl+C получили и дочерние процессы, ждём, пока они доработают.
+            for process in processes:
+                process.join()
@@ -0,0 +1,160 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from .query_budget import query_budget
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Границы одного диапазона из заголовка Range включительно.
+
+    None — отдать файл целиком (заголовка нет или диапазонов
+    несколько), ValueError — диапазон за пределами файла.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(file, start, end):
+    try:
+        file.seek(start)
+        left = end - start + 1
+        while left > 0:
+            chunk = file.read(min(CHUNK_SIZE, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def media_path(name):
+    """Путь файла, если его можно отдавать: только MEDIA_SERVE_DIRS."""
+    name = posixpath.normpath(name)
+    if name.split('/', 1)[0] not in settings.MEDIA_SERVE_DIRS:
+        raise Http404
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def etag(stat):
+    return quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+
+
+def not_modified(request, stat):
+    """У клиента та же версия файла: можно ответить 304.
+
+    Если есть If-None-Match, If-Modified-Since не смотрится
+    (RFC 7232, 6). ETag сравниваются слабо: W/ отбрасывается.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        current = etag(stat)
+        return any(
+            tag == '*' or tag.replace('W/', '', 1) == current
+            for tag in parse_etags(if_none_match)
+        )
+    return not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size
+    )
+
+
+def validators(response, stat):
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag(stat)
+    return response
+
+
+def cache_headers(response, stat):
+    # Имена картинок и миниатюр не переиспользуются для другого
+    # содержимого, поэтому ответ можно не перепроверять.
+    response['Cache-Control'] = (
+        f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    )
+    response['Accept-Ranges'] = 'bytes'
+    return validators(response, stat)
+
+
+@require_safe
+@query_budget(0)
+def serve(request, name):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    За прокси передача уходит ему через MEDIA_ACCEL_HEADER: nginx
+    (X-Accel-Redirect) или Apache/lighttpd (X-Sendfile) сами отдают
+    байты и диапазоны. Без прокси целый файл идёт через FileResponse,
+    и сервер WSGI отправляет его sendfile без копирования в Python;
+    диапазоны читаются кусками.
+    """
+    path = media_path(name)
+    stat = os.stat(path)
+    content_type = (mimetypes.guess_type(path)[0]
+                    or 'application/octet-stream')
+    if not_modified(request, stat):
+        return cache_headers(HttpResponse(status=304), stat)
+
+    header = settings.MEDIA_ACCEL_HEADER
+    if header == 'X-Accel-Redirect':
+        response = HttpResponse(content_type=content_type)
+        response[header] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        return cache_headers(response, stat)
+    if header:
+        response = HttpResponse(content_type=content_type)
+        response[header] = path
+        return cache_headers(response, stat)
+
+    requested = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if requested and if_range not in (None, etag(stat)):
+        requested = None
+    try:
+        bounds = requested and parse_range(requested, stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if not bounds:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = bounds
+        response = StreamingHttpResponse(
+            read_range(open(path, 'rb'), start, end),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return cache_headers(response, stat)
@@ -0,0 +1,92 @@
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View выполнил больше запросов, чем объявлено, или запросы N+1."""
+
+
+def query_budget(limit):
+    """Объявляет для view максимальное число SQL-запросов за запрос."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def query_shape(sql):
+    """SQL без литералов: одинаковые формы с разными id — признак N+1."""
+    return IN_LISTS.sub('IN (...)', LITERALS.sub('?', sql))
+
+
+def check_queries(view_name, queries, budget):
+    """Возвращает список нарушений для выполненных view запросов."""
+    problems = []
+    if budget is not None and len(queries) > budget:
+        problems.append(
+            f'{view_name}: {len(queries)} запросов при бюджете {budget}'
+        )
+    shapes = Counter(query_shape(query['sql']) for query in queries)
+    for shape, repeats in shapes.items():
+        if repeats > settings.QUERY_BUDGET_REPEAT_LIMIT:
+            problems.append(
+                f'{view_name}: N+1, запрос повторён {repeats} раз: {shape}'
+            )
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """Записывает SQL каждого запроса и сверяет его с бюджетом view.
+
+    Включается настройкой QUERY_BUDGET_ENABLED. Нарушения пишутся
+    в лог, а при QUERY_BUDGET_RAISE поднимают QueryBudgetExceeded,
+    что в тестах роняет проверку превысившего бюджет view.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Чтения могут уйти в реплику, поэтому пишутся все соединения;
+        # execute_wrapper, в отличие от CaptureQueriesContext, не открывает
+        # соединение, которое запросу не понадобилось.
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append({'sql': sql})
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(record))
+            response = self.get_response(request)
+        view = getattr(request, '_query_budget_view', None)
+        if view is None:
+            return response
+        problems = check_queries(
+            request.resolver_match.view_name,
+            queries,
+            getattr(view, 'query_budget', None)
+        )
+        if problems:
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded('\n'.join(problems))
+            for problem in problems:
+                logger.warning(problem)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
@@ -0,0 +1,129 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+from . import css, media
+from .query_budget import query_budget
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.map', '.txt')
+# Порядок — по предпочтению при выборе варианта для клиента.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data)
+
+
+class StaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и сжатыми копиями.
+
+    Перед хэшированием из STATIC_PURGE_CSS убираются правила с
+    классами, которых нет в STATIC_PURGE_CONTENT. После — рядом с
+    каждым текстовым файлом пишутся .gz и, если установлен brotli,
+    .br, чтобы не сжимать их на каждый запрос.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.purge(paths)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                if name.endswith(COMPRESSIBLE):
+                    self.compress(name)
+
+    def purge(self, paths):
+        used = None
+        for name in settings.STATIC_PURGE_CSS:
+            if name not in paths:
+                continue
+            if used is None:
+                used = css.used_words(settings.STATIC_PURGE_CONTENT)
+            storage, path = paths[name]
+            with storage.open(path) as file:
+                purged = css.purge(file.read().decode('utf-8'), used)
+            self.replace(name, purged.encode('utf-8'))
+            # Хэш и сжатые копии считаются уже по очищенному файлу.
+            paths[name] = (self, name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, compress in compressors():
+            packed = compress(data)
+            if len(packed) < len(data):
+                self.replace(name + suffix, packed)
+
+    def replace(self, name, data):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(data))
+
+
+def static_path(name):
+    name = posixpath.normpath(name)
+    if name.startswith('..') or not settings.STATIC_ROOT:
+        raise Http404
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return name, path
+
+
+def is_hashed(name):
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return name in hashed_files.values()
+
+
+@require_safe
+@query_budget(0)
+def serve(request, name):
+    """Отдаёт файл из STATIC_ROOT, сжатую копию — если клиент её примет.
+
+    Файлы с хэшем в имени не меняются и кэшируются навсегда, прочие
+    браузер перепроверяет.
+    """
+    name, path = static_path(name)
+    content_type = (mimetypes.guess_type(path)[0]
+                    or 'application/octet-stream')
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encoding = None
+    for candidate, suffix in ENCODINGS:
+        if candidate in accepted and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+    stat = os.stat(path)
+    if media.not_modified(request, stat):
+        response = HttpResponse(status=304)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    if is_hashed(name):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_CACHE_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = 'no-cache'
+    response['Vary'] = 'Accept-Encoding'
+    return media.validators(response, stat)
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+
+def content_hash(content):
+    """sha256 содержимого: посчитанный при приёме или по кускам файла."""
+    digest = getattr(content, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+    return digest
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из хэша содержимого.
+
+    Имя вида ``posts/ab/abcd….jpg`` не зависит от того, как файл
+    назвал пользователь, поэтому повторная загрузка того же файла
+    ничего не пишет на диск и получает уже готовые миниатюры.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content_hash(content))
+        try:
+            # Свежее время изменения защищает переиспользованный файл
+            # от сборщика мусора, пока пост ещё не сохранён.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return self._save(name, content)
+        return name
+
+    @staticmethod
+    def hashed_name(name, digest):
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+
+def retain(name):
+    """Отмечает ещё одну ссылку на файл."""
+    if not name:
+        return
+    stored = StoredFile.objects.filter(name=name)
+    if stored.update(refs=F('refs') + 1, updated=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, refs=1)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        stored.update(refs=F('refs') + 1, updated=timezone.now())
+
+
+def release(name):
+    """Снимает ссылку на файл; сам файл удаляет сборщик мусора."""
+    if name:
+        (StoredFile
+         .objects
+         .filter(name=name, refs__gt=0)
+         .update(refs=F('refs') - 1, updated=timezone.now()))
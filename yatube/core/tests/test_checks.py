@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_cache
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+MEMCACHED = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    }
+}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_process_local_cache_rejected_in_production(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(DEBUG=False, CACHES=MEMCACHED)
+    def test_shared_cache_accepted(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM)
+    def test_process_local_cache_allowed_in_debug(self):
+        self.assertEqual(check_shared_cache(None), [])
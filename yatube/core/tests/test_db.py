@@ -0,0 +1,27 @@
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+
+class SQLiteBackendTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_set_on_connection(self):
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+
+class ImmediateTransactionTests(TransactionTestCase):
+    def test_atomic_takes_write_lock_at_start(self):
+        executed = []
+        with connection.execute_wrapper(
+            lambda execute, sql, *args: executed.append(sql)
+            or execute(sql, *args)
+        ):
+            with transaction.atomic():
+                pass
+        self.assertIn('BEGIN IMMEDIATE', executed)
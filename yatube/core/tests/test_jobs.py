@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Follow, Post, TimelineEntry
+
+from .. import jobs
+from ..models import Job
+
+User = get_user_model()
+
+calls = []
+
+
+@jobs.task
+def record(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    Job.objects.create(name='side effect')
+    raise ValueError('boom')
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_stores_job_until_worker_runs_it(self):
+        record.delay('a', suffix='!')
+        self.assertEqual(calls, [])
+        self.assertEqual(Job.objects.get().name, record.name)
+        self.assertEqual(jobs.work('test', once=True), 1)
+        self.assertEqual(calls, ['a!'])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_immediately(self):
+        record.delay('b')
+        self.assertEqual(calls, ['b'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_rolled_back_enqueue_is_dropped(self):
+        with transaction.atomic():
+            record.delay('c')
+            transaction.set_rollback(True)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = explode.delay()
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(jobs.work('test', once=True), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.last_error)
+        self.assertGreaterEqual(
+            job.run_at, timezone.now() + timedelta(seconds=9)
+        )
+        # Сделанное упавшей задачей откатилось.
+        self.assertFalse(Job.objects.filter(name='side effect').exists())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.work('test', once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_claims_in_batches_and_reclaims_abandoned_jobs(self):
+        for value in 'xyz':
+            record.delay(value)
+        claimed = jobs.claim('first', batch_size=2)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(len(jobs.claim('second', batch_size=2)), 1)
+        self.assertEqual(jobs.claim('third', batch_size=2), [])
+        Job.objects.filter(pk=claimed[0].pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        reclaimed = jobs.claim('third', batch_size=2)
+        self.assertEqual([job.pk for job in reclaimed], [claimed[0].pk])
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+
+@override_settings(JOBS_EAGER=False)
+class WorkerCommandTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_threads_drain_queue(self):
+        for value in range(6):
+            record.delay(value)
+        out = StringIO()
+        call_command(
+            'worker', once=True, threads=3, batch_size=2, poll_interval=0,
+            stdout=out
+        )
+        self.assertIn('Выполнено задач: 6', out.getvalue())
+        self.assertEqual(sorted(calls), [str(value) for value in range(6)])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(JOBS_EAGER=False)
+class PostJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_fan_out_waits_for_worker(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        entries = TimelineEntry.objects.filter(user=self.reader, post=post)
+        self.assertFalse(entries.exists())
+        jobs.work('test', once=True)
+        self.assertTrue(entries.exists())
+
+    def test_deleted_post_is_skipped(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.delete()
+        jobs.work('test', once=True)
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+from ..media import parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(parse_range('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=-24', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=1000-5000', 1024), (1000, 1023))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1024))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=2000-', 1024)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'),
+                  'wb') as file:
+            file.write(CONTENT)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'secret.txt'), 'w') as file:
+            file.write('secret')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_whole_file_is_streamed_with_cache_headers(self):
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        revalidated = Client().get(
+            '/media/posts/a.jpg', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_if_none_match_takes_precedence(self):
+        tag = self.client.get('/media/posts/a.jpg')['ETag']
+        last_modified = self.client.get('/media/posts/a.jpg')['Last-Modified']
+        for header, status in (
+            (f'"other", W/{tag}', 304),
+            ('*', 304),
+            ('"other"', 200),
+        ):
+            with self.subTest(header=header):
+                response = Client().get(
+                    '/media/posts/a.jpg', HTTP_IF_NONE_MATCH=header,
+                    HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, status)
+        response = Client().get(
+            '/media/posts/a.jpg', HTTP_IF_NONE_MATCH=f'"other", W/{tag}'
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.client.get('/media/posts/a.jpg',
+                                   HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         CONTENT[10:20])
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get('/media/posts/a.jpg',
+                                   HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.client.get('/media/posts/a.jpg',
+                                   HTTP_RANGE='bytes=10-19',
+                                   HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_media_dirs_are_served(self):
+        for url in ('/media/secret.txt', '/media/posts/../secret.txt',
+                    '/media/posts/missing.jpg'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/a.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL_HEADER='X-Sendfile')
+    def test_sendfile(self):
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg')
+        )
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from core import jobs
+from core.db import replica
+
+User = get_user_model()
+
+
+def view(request):
+    return HttpResponse()
+
+
+@replica.replica_read
+def read_view(request):
+    return HttpResponse()
+
+
+@jobs.task
+def create_user():
+    User.objects.create_user(username='job_writer')
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def request(self, view_func=read_view, cookie=None,
+                write=False):
+        def get_response(request):
+            middleware.process_view(request, view_func, (), {})
+            self.seen.append((replica.current_alias(), replica.is_stale()))
+            if write:
+                User.objects.create_user(username='writer')
+            return HttpResponse()
+
+        middleware = replica.ReplicaMiddleware(get_response)
+        request = self.factory.get('/')
+        if cookie is not None:
+            request.COOKIES[replica.COOKIE] = repr(cookie)
+        return middleware(request)
+
+    def test_unsynced_replica_is_not_used(self):
+        self.request()
+        self.assertEqual(self.seen, [('default', False)])
+
+    def test_reads_go_to_synced_replica(self):
+        replica.mark_written(time.time() - 10)
+        cache.set(replica.SYNCED_KEY, time.time(), None)
+        self.request()
+        self.request(view_func=view)
+        self.assertEqual(self.seen, [('replica', False), ('default', False)])
+        self.assertEqual(replica.current_alias(), 'default')
+
+    def test_lagging_replica_is_stale(self):
+        cache.set(replica.SYNCED_KEY, time.time() - 10, None)
+        replica.mark_written()
+        self.request()
+        self.assertEqual(self.seen, [('replica', True)])
+
+    def test_job_write_makes_running_request_stale(self):
+        replica.mark_written(time.time() - 10)
+        cache.set(replica.SYNCED_KEY, time.time() - 5, None)
+
+        def get_response(request):
+            middleware.process_view(request, read_view, (), {})
+            self.seen.append(replica.is_stale())
+            create_user.run()
+            self.seen.append(replica.is_stale())
+            return HttpResponse()
+
+        middleware = replica.ReplicaMiddleware(get_response)
+        middleware(self.factory.get('/'))
+        self.assertEqual(self.seen, [False, True])
+
+    def test_job_writes_are_marked(self):
+        create_user.run()
+        self.assertIsNotNone(cache.get(replica.WRITTEN_KEY))
+
+    def test_own_write_reads_primary_until_synced(self):
+        synced = time.time()
+        cache.set(replica.SYNCED_KEY, synced, None)
+        response = self.request(write=True)
+        written = float(response.cookies[replica.COOKIE].value)
+        self.assertGreaterEqual(written, synced)
+        self.assertEqual(cache.get(replica.WRITTEN_KEY), written)
+        self.request(cookie=written)
+        cache.set(replica.SYNCED_KEY, written + 1, None)
+        self.request(cookie=written)
+        self.assertEqual(
+            [alias for alias, _ in self.seen],
+            ['replica', 'default', 'replica']
+        )
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = os.path.join(directory, 'source.sqlite3')
+            target_path = os.path.join(directory, 'target.sqlite3')
+            source = sqlite3.connect(source_path)
+            source.execute('CREATE TABLE t (x)')
+            source.execute('INSERT INTO t VALUES (1)')
+            source.commit()
+            source.close()
+            replica.copy_database(source_path, target_path)
+            target = sqlite3.connect(target_path)
+            self.assertEqual(target.execute('SELECT x FROM t').fetchall(),
+                             [(1,)])
+            target.close()
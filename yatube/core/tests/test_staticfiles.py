@@ -0,0 +1,110 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..css import purge
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE = os.path.join(TEMP_DIR, 'static')
+ROOT = os.path.join(TEMP_DIR, 'collected')
+TEMPLATES = os.path.join(TEMP_DIR, 'templates')
+
+BOOTSTRAP = (
+    '/*! Bootstrap */:root{--blue:#007bff}'
+    '.btn,.btn-unused{color:red}.carousel{display:block}'
+    '@media (min-width:576px){.container{max-width:540px}.modal{top:0}}'
+    '@media print{.d-print-none{display:none}}'
+    + '.filler{margin:0}' * 50
+)
+
+
+class PurgeTests(TestCase):
+    def test_keeps_only_used_selectors(self):
+        self.assertEqual(
+            purge(BOOTSTRAP, {'btn', 'container', 'filler'}),
+            '/*! Bootstrap */:root{--blue:#007bff}.btn{color:red}'
+            '@media (min-width:576px){.container{max-width:540px}}'
+            + '.filler{margin:0}' * 50
+        )
+
+    def test_nested_selector_lists_and_strings(self):
+        css = '.a:not(.b,.c){x:1}.d::before{content:"}"}@charset "x";'
+        self.assertEqual(purge(css, {'a', 'b', 'c'}),
+                         '.a:not(.b,.c){x:1}@charset "x";')
+
+    def test_negated_and_attribute_classes_are_not_required(self):
+        css = (
+            '.btn:not(.disabled):hover{x:1}.nav-link:not(.active){x:2}'
+            '.btn:not(:disabled):not(.disabled){x:3}'
+            'a[href$=".pdf"]{x:4}.card:not(.unused .x){x:5}.unused{x:6}'
+        )
+        self.assertEqual(
+            purge(css, {'btn', 'nav-link', 'card'}),
+            '.btn:not(.disabled):hover{x:1}.nav-link:not(.active){x:2}'
+            '.btn:not(:disabled):not(.disabled){x:3}'
+            'a[href$=".pdf"]{x:4}.card:not(.unused .x){x:5}'
+        )
+
+
+@override_settings(
+    STATICFILES_STORAGE='core.staticfiles.StaticFilesStorage',
+    STATICFILES_DIRS=[SOURCE],
+    STATIC_ROOT=ROOT,
+    STATIC_PURGE_CONTENT=[TEMPLATES],
+)
+class StaticFilesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE, 'css'))
+        os.makedirs(os.path.join(SOURCE, 'img', 'fav'))
+        os.makedirs(TEMPLATES)
+        # Их загружает base.html, который нужен странице 404.
+        for name in ('img/logo.png', 'img/fav/favicon.ico'):
+            open(os.path.join(SOURCE, name), 'wb').close()
+        with open(os.path.join(SOURCE, 'css', 'bootstrap.min.css'),
+                  'w') as file:
+            file.write(BOOTSTRAP)
+        with open(os.path.join(TEMPLATES, 'base.html'), 'w') as file:
+            file.write('<div class="container"><a class="btn filler">')
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(ROOT, 'staticfiles.json')) as file:
+            cls.hashed = json.load(file)['paths']['css/bootstrap.min.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_collectstatic_purges_hashes_and_compresses(self):
+        self.assertRegex(self.hashed, r'^css/bootstrap\.min\.\w{12}\.css$')
+        with open(os.path.join(ROOT, self.hashed)) as file:
+            css = file.read()
+        self.assertNotIn('carousel', css)
+        self.assertIn('.container', css)
+        with gzip.open(os.path.join(ROOT, self.hashed + '.gz'), 'rt') as file:
+            self.assertEqual(file.read(), css)
+
+    def test_hashed_file_is_immutable_and_precompressed(self):
+        response = self.client.get(f'/static/{self.hashed}',
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        plain = self.client.get(f'/static/{self.hashed}')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_unhashed_name_is_revalidated(self):
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(
+            self.client.get('/static/../staticfiles.json').status_code, 404
+        )
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post
+
+from ..models import StoredFile
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+
+
+def upload(name):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, name):
+        return Post.objects.create(
+            author=self.user, text=name, image=upload(name)
+        )
+
+    def test_duplicate_upload_reuses_file(self):
+        first = self.create('first.GIF')
+        second = self.create('second.gif')
+        name = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
+        self.assertEqual(first.image.name, name)
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts', DIGEST[:2])),
+            [f'{DIGEST}.gif']
+        )
+        self.assertEqual(StoredFile.objects.get(name=name).refs, 2)
+        first.delete()
+        self.assertEqual(StoredFile.objects.get(name=name).refs, 1)
+
+    def test_duplicate_upload_reuses_thumbnails(self):
+        first = self.create('first.gif')
+        with mock.patch('posts.thumbnails.generate') as generate:
+            second = self.create('second.gif')
+        generate.assert_not_called()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.thumbnail_urls, first.thumbnail_urls)
+        self.assertIn('card', second.thumbnail_urls)
+
+    def test_upload_is_hashed_while_received(self):
+        request = RequestFactory().post('/', {'image': upload('first.gif')})
+        self.assertEqual(request.FILES['image'].sha256, DIGEST)
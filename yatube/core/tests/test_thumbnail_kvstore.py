@@ -0,0 +1,108 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default, get_thumbnail
+
+from posts.models import Post
+
+from .. import thumbnail_kvstore
+from ..thumbnail_kvstore import LRU, MISSING
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class LRUTests(TestCase):
+    def test_evicts_least_recently_used_by_size(self):
+        lru = LRU(max_size=10, timeout=60)
+        lru.set('a', '1234')
+        lru.set('b', '1234')
+        lru.get('a')
+        lru.set('c', '1234')
+        self.assertEqual(lru.get('a'), '1234')
+        self.assertIs(lru.get('b'), MISSING)
+        self.assertEqual(lru.size, 10)
+
+    def test_remembers_missing_values_and_expires(self):
+        lru = LRU(max_size=100, timeout=60)
+        lru.set('absent', None)
+        self.assertIsNone(lru.get('absent'))
+        with mock.patch('core.thumbnail_kvstore.time.monotonic',
+                        return_value=10 ** 9):
+            self.assertIs(lru.get('absent'), MISSING)
+
+    def test_skips_values_larger_than_limit(self):
+        lru = LRU(max_size=4, timeout=60)
+        lru.set('key', 'value')
+        self.assertIs(lru.get('key'), MISSING)
+        self.assertEqual(lru.size, 0)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class KVStoreTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnail_kvstore.lru.clear()
+        self.images = [
+            Post(image=default_storage.save(
+                f'posts/kv{index}.gif', ContentFile(SMALL_GIF)
+            )).image
+            for index in range(3)
+        ]
+        for image in self.images:
+            get_thumbnail(image, '960x339', crop='center')
+        cache.clear()
+        thumbnail_kvstore.lru.clear()
+
+    def test_prefetch_reads_page_in_two_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            default.kvstore.prefetch(self.images)
+        self.assertEqual(len(captured), 2)
+        with CaptureQueriesContext(connection) as captured:
+            for image in self.images:
+                get_thumbnail(image, '960x339', crop='center')
+        self.assertEqual(len(captured), 0)
+
+    def test_evict_forgets_source_and_thumbnails(self):
+        default.kvstore.prefetch(self.images[:1])
+        default.kvstore.evict(self.images[0])
+        with CaptureQueriesContext(connection) as captured:
+            get_thumbnail(self.images[0], '960x339', crop='center')
+        self.assertTrue(any(
+            'thumbnail_kvstore' in query['sql'] for query in captured
+        ))
+
+    def test_image_change_evicts_entries(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            author=author, text='Пост', image=self.images[0].name
+        )
+        post.image = self.images[1].name
+        with mock.patch.object(default.kvstore, 'evict') as evict:
+            post.save()
+        evict.assert_called_once_with(
+            self.images[0].name, self.images[1].name
+        )
@@ -0,0 +1,42 @@
+import threading
+from contextlib import contextmanager
+
+from sorl.thumbnail.engines import pil_engine
+
+_state = threading.local()
+
+
+@contextmanager
+def single_decode():
+    """Внутри блока каждая исходная картинка декодируется один раз.
+
+    sorl открывает исходник заново для каждой миниатюры; здесь
+    декодированное изображение переиспользуется всеми размерами
+    и форматами и закрывается на выходе из блока.
+    """
+    if getattr(_state, 'decoded', None) is not None:
+        yield
+        return
+    _state.decoded = {}
+    try:
+        yield
+    finally:
+        for image in _state.decoded.values():
+            image.close()
+        _state.decoded = None
+
+
+class Engine(pil_engine.Engine):
+    def get_image(self, source):
+        decoded = getattr(_state, 'decoded', None)
+        if decoded is None:
+            return super().get_image(source)
+        if source.name not in decoded:
+            image = super().get_image(source)
+            image.load()
+            decoded[source.name] = image
+        return decoded[source.name]
+
+    def cleanup(self, image):
+        if getattr(_state, 'decoded', None) is None:
+            super().cleanup(image)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+MISSING = object()
+
+
+class LRU:
+    """Ограниченный по объёму кэш строк sorl в памяти процесса.
+
+    Размер записи — длина ключа и значения; при переполнении
+    вытесняются давно не читанные. Отсутствие значения тоже
+    запоминается, чтобы не спрашивать базу повторно. Записи живут
+    не дольше ``timeout``: другие процессы не узнают о сбросе.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def weight(key, value):
+        return len(key) + (len(value) if value else 0)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if expires < time.monotonic():
+                self._pop(key)
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        weight = self.weight(key, value)
+        if weight > self.max_size:
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.size += weight
+            while self.size > self.max_size:
+                self._pop(next(iter(self.entries)))
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= self.weight(key, entry[0])
+
+
+lru = LRU(
+    settings.THUMBNAIL_KVSTORE_LRU_SIZE,
+    settings.THUMBNAIL_KVSTORE_LRU_TIMEOUT
+)
+
+
+class KVStore(CachedDBKVStore):
+    """Хранилище sorl: память процесса, затем кэш, затем база.
+
+    ``prefetch`` читает записи целой страницы картинок двумя запросами
+    вместо отдельного запроса на каждую картинку и размер.
+    """
+
+    def _get_raw(self, key):
+        value = lru.get(key)
+        if value is MISSING:
+            value = super()._get_raw(key)
+            lru.set(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        """Одна запись вместо get_or_create: о наличии строки уже
+        известно из памяти, если ключ читали перед записью.
+        """
+        if lru.get(key) is None:
+            KVStoreModel.objects.bulk_create(
+                [KVStoreModel(key=key, value=value)], ignore_conflicts=True
+            )
+        elif not KVStoreModel.objects.filter(key=key).update(value=value):
+            KVStoreModel.objects.create(key=key, value=value)
+        self.cache.set(key, value, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        lru.delete(*keys)
+
+    def clear(self, *args, **kwargs):
+        super().clear(*args, **kwargs)
+        lru.clear()
+
+    def prefetch(self, files):
+        """Загружает записи картинок и их миниатюр в память процесса."""
+        sources = [ImageFile(file).key for file in files if file]
+        lists = self._load([
+            add_prefix(key, identity)
+            for key in sources
+            for identity in ('image', 'thumbnails')
+        ])
+        thumbnails = [
+            add_prefix(thumbnail_key)
+            for key in sources
+            for thumbnail_key in deserialize(
+                lists.get(add_prefix(key, 'thumbnails')) or '[]'
+            )
+        ]
+        self._load(thumbnails)
+
+    def _load(self, keys):
+        """Значения ключей: из памяти, из кэша и одним запросом из базы."""
+        values = {}
+        missing = []
+        for key in keys:
+            value = lru.get(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                values[key] = value
+        if missing:
+            cached = self.cache.get_many(missing)
+            stored = dict(KVStoreModel
+                          .objects
+                          .filter(key__in=set(missing) - set(cached))
+                          .values_list('key', 'value'))
+            found = {
+                key: stored.get(key, EMPTY_VALUE)
+                for key in missing if key not in cached
+            }
+            self.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            for key in missing:
+                value = cached.get(key, found.get(key))
+                value = None if value == EMPTY_VALUE else value
+                lru.set(key, value)
+                values[key] = value
+        return values
+
+    def evict(self, *files):
+        """Забывает записи картинок и их миниатюр в памяти и в кэше.
+
+        База остаётся источником истины и прочитается заново.
+        """
+        keys = []
+        for file in filter(None, files):
+            source = ImageFile(file).key
+            listed = self._get(source, identity='thumbnails') or []
+            keys.extend(add_prefix(key) for key in listed)
+            keys.append(add_prefix(source))
+            keys.append(add_prefix(source, 'thumbnails'))
+        lru.delete(*keys)
+        self.cache.delete_many(keys)
@@ -0,0 +1,42 @@
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler as BaseMemoryFileUploadHandler,
+    TemporaryFileUploadHandler as BaseTemporaryFileUploadHandler
+)
+
+
+class HashingMixin:
+    """Считает sha256 файла по кускам, пока он принимается.
+
+    Хэш кладётся в атрибут ``sha256`` загруженного файла: по нему
+    находится уже сохранённая копия той же загрузки (см.
+    posts.images.find_uploaded), а хранилище не перечитывает файл.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Обработчик в памяти прерывает цепочку исключением, так что
+        # хэш заводится до вызова родителя.
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed = super().receive_data_chunk(raw_data, start)
+        if passed is None:
+            self.hasher.update(raw_data)
+        return passed
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class MemoryFileUploadHandler(HashingMixin, BaseMemoryFileUploadHandler):
+    pass
+
+
+class TemporaryFileUploadHandler(HashingMixin,
+                                 BaseTemporaryFileUploadHandler):
+    pass
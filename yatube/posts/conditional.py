@@ -0,0 +1,105 @@
+from django.db.models import Max, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from . import page_cache
+from .models import Comment, Group, Post, User
+
+
+def post_validators(request, post_id):
+    # Подзапрос берёт последний комментарий из индекса (post, created)
+    # без GROUP BY и временной сортировки.
+    last_comment = (Comment
+                    .objects
+                    .filter(post=OuterRef('pk'))
+                    .order_by('-created')
+                    .values('created')[:1])
+    row = (Post
+           .objects
+           .filter(pk=post_id)
+           .annotate(last_comment=Subquery(last_comment))
+           .values_list('updated', 'last_comment', 'comment_count')
+           .first())
+    if row is None:
+        return None
+    updated, last_comment, comment_count = row
+    return (
+        [post_id, comment_count],
+        max(filter(None, (updated, last_comment))),
+        page_cache.post_scopes(request, post_id)
+    )
+
+
+def profile_validators(request, username):
+    row = (User
+           .objects
+           .filter(username=username)
+           .values_list('pk', 'stats__post_count')
+           .first())
+    if row is None:
+        return None
+    author_id, post_count = row
+    last_modified = (Post
+                     .objects
+                     .filter(author_id=author_id)
+                     .aggregate(last=Max('updated'))['last'])
+    return (
+        [author_id, post_count],
+        last_modified,
+        page_cache.profile_scopes(request, username)
+    )
+
+
+def group_validators(request, slug):
+    row = (Group
+           .objects
+           .filter(slug=slug)
+           .values_list('pk', 'post_count')
+           .first())
+    if row is None:
+        return None
+    group_id, post_count = row
+    last_modified = (Post
+                     .objects
+                     .filter(group_id=group_id)
+                     .aggregate(last=Max('updated'))['last'])
+    return (
+        [group_id, post_count],
+        last_modified,
+        page_cache.group_scopes(request, slug)
+    )
+
+
+def conditional_get(validators):
+    """Отвечает 304 до выполнения view, если страница не менялась.
+
+    ``validators(request, **kwargs)`` возвращает счётчики строки,
+    время последнего изменения по индексированным максимумам
+    (``updated`` постов, ``created`` комментариев) и области
+    page_cache. ETag собирается из счётчиков, времени и версий
+    областей, поэтому меняется и при удалении строк, и при
+    переименовании автора или группы: page_cache сбрасывает области
+    всех страниц, где они показаны. Last-Modified не отдаётся:
+    по одному времени не видно ни удалений, ни переименований, и
+    If-Modified-Since получал бы 304 на устаревшую страницу.
+    Страницы авторизованных пользователей зависят от их подписок и
+    шапки и не валидируются.
+    """
+    def get(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_validators'):
+            request._conditional_validators = (
+                None if request.user.is_authenticated
+                else validators(request, *args, **kwargs)
+            )
+        return request._conditional_validators
+
+    def etag(request, *args, **kwargs):
+        found = get(request, *args, **kwargs)
+        if found is None:
+            return None
+        counts, last_modified, scopes = found
+        parts = counts + [
+            last_modified.timestamp() if last_modified else 0
+        ] + page_cache.scope_versions(scopes)
+        return '-'.join(str(part) for part in parts)
+
+    return condition(etag_func=etag)
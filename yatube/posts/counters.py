@@ -0,0 +1,115 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import StoredFile
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        # Разошедшийся счётчик не должен ломать удаление строк.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    """Сдвигает счётчик пользователя; недостающую строку пересчитывает."""
+    updated = _bump(UserStats.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        # При удалении строку не создаём: пользователь может удаляться
+        # каскадом, а при чтении user_stats() её всё равно пересчитает.
+        rebuild_user(user_id)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'post_count', delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comment_count', delta)
+
+
+def rebuild_user(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'post_count': Post.objects.filter(author_id=user_id).count(),
+            'follower_count': (Follow
+                               .objects
+                               .filter(author_id=user_id)
+                               .count()),
+            'following_count': Follow.objects.filter(user_id=user_id).count(),
+        }
+    )
+    return stats
+
+
+def user_stats(user):
+    """Счётчики пользователя, без пересчёта, если строка уже есть."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return rebuild_user(user.pk)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0)
+    )
+
+
+def rebuild_image_refs():
+    """Пересчитывает ссылки на картинки, например после bulk_create."""
+    names = (Post
+             .objects
+             .exclude(image='')
+             .order_by()
+             .values_list('image', flat=True)
+             .distinct())
+    StoredFile.objects.bulk_create(
+        (StoredFile(name=name) for name in names),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    StoredFile.objects.update(refs=Coalesce(
+        Subquery(
+            Post.objects
+            .filter(image=OuterRef('name'))
+            .order_by()
+            .values('image')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0)
+    ))
+
+
+def rebuild_all():
+    """Пересчитывает все счётчики одним UPDATE на таблицу."""
+    Group.objects.update(post_count=_count(Post.objects, 'group'))
+    Post.objects.update(comment_count=_count(Comment.objects, 'post'))
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ),
+        batch_size=500
+    )
+    UserStats.objects.update(
+        post_count=_count(Post.objects, 'author'),
+        follower_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+    rebuild_image_refs()
@@ -0,0 +1,117 @@
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+
+from . import versions
+from .models import Follow
+
+# Набор лежит под ключом с версией: правка подписок сдвигает версию,
+# и набор, собранный до правки, больше не читается.
+VERSION_KEY = 'following_version:{}'
+KEY = 'following:{}:{}'
+
+
+class IntSet:
+    """Отсортированный массив id: 8 байт на элемент, поиск — bisect."""
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = array('q', sorted(set(ids)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        intset = cls()
+        intset.ids.frombytes(data)
+        return intset
+
+    def to_bytes(self):
+        return self.ids.tobytes()
+
+    def __contains__(self, value):
+        index = bisect_left(self.ids, value)
+        return index < len(self.ids) and self.ids[index] == value
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, value):
+        if value not in self:
+            insort(self.ids, value)
+
+    def discard(self, value):
+        index = bisect_left(self.ids, value)
+        if index < len(self.ids) and self.ids[index] == value:
+            del self.ids[index]
+
+
+def _key(user_id):
+    version_key = VERSION_KEY.format(user_id)
+    return KEY.format(user_id, versions.get_many([version_key])[version_key])
+
+
+def _load(user_id):
+    """Набор из кэша, при промахе — из основной базы.
+
+    Реплика может отставать, а набор живёт в кэше долго. Внутри
+    транзакции кэш не читается и не заполняется: её изменения ещё
+    могут откатиться. Версия читается до базы, поэтому набор,
+    прочитанный до чужой правки, ляжет под устаревший ключ.
+    """
+    using = router.db_for_write(Follow)
+    cacheable = not connections[using].in_atomic_block
+    if cacheable:
+        key = _key(user_id)
+        data = cache.get(key)
+        if data is not None:
+            return IntSet.from_bytes(data)
+    following = IntSet(Follow
+                       .objects
+                       .db_manager(using)
+                       .filter(user_id=user_id)
+                       .values_list('author_id', flat=True))
+    if cacheable:
+        cache.add(key, following.to_bytes(), settings.FOLLOW_GRAPH_TIMEOUT)
+    return following
+
+
+def following(user):
+    """id авторов, на которых подписан пользователь.
+
+    Читается из кэша один раз за запрос и запоминается на объекте
+    пользователя; у анонима подписок нет.
+    """
+    if not user.is_authenticated:
+        return IntSet()
+    if not hasattr(user, '_following_ids'):
+        user._following_ids = _load(user.pk)
+    return user._following_ids
+
+
+def is_following(user, author_id):
+    return author_id in following(user)
+
+
+def _expire(user_id):
+    """После фиксации сдвигает версию набора подписок.
+
+    Сдвиг атомарен, в отличие от правки набора на месте, поэтому
+    одновременные подписки не затирают друг друга. Новый набор
+    соберёт первое чтение.
+    """
+    transaction.on_commit(
+        lambda: versions.bump(VERSION_KEY.format(user_id))
+    )
+
+
+def followed(user_id, author_id):
+    _expire(user_id)
+
+
+def unfollowed(user_id, author_id):
+    _expire(user_id)
@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 from django.utils.translation import gettext_lazy as _
 
+from . import images
 from .models import Comment, Post
 
 
@@ -17,6 +19,30 @@ class PostForm(ModelForm):
             'group': _('Группа, к которой будет относиться пост')
         }
 
+    def clean_image(self):
+        """Новую картинку перекодирует, запоминает её размеры и заглушку.
+
+        Файл, который уже загружали, не перекодируется: пост получает
+        готовую картинку.
+        """
+        image = self.cleaned_data['image']
+        upload_hash = ''
+        if isinstance(image, UploadedFile):
+            upload_hash = getattr(image, 'sha256', '')
+            found = images.find_uploaded(image)
+            if found is None:
+                image, size, placeholder = images.normalize(image)
+            else:
+                image, size, placeholder = found
+        elif image:
+            return image
+        else:
+            size, placeholder = (None, None), ''
+        self.instance.image_width, self.instance.image_height = size
+        self.instance.image_placeholder = placeholder
+        self.instance.image_upload_hash = upload_hash
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
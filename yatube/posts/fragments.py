@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db import replica
+
+from . import versions
+
+VERSION_KEY = 'post_card_version:{}:{}'
+
+
+def bump(kind, pk):
+    """Сдвигает версию поста, автора или группы."""
+    versions.bump(VERSION_KEY.format(kind, pk))
+
+
+def _version_keys(post):
+    return (
+        VERSION_KEY.format('post', post.pk),
+        VERSION_KEY.format('author', post.author_id),
+        VERSION_KEY.format('group', post.group_id),
+    )
+
+
+def card_keys(posts, variant):
+    """Ключи кэша карточек страницы: одно чтение версий на все посты."""
+    posts = list(posts)
+    current = versions.get_many(
+        key for post in posts for key in _version_keys(post)
+    )
+    return {
+        post.pk: ':'.join(
+            ['post_card', variant, str(post.pk)]
+            + [str(current[key]) for key in _version_keys(post)]
+        )
+        for post in posts
+    }
+
+
+def get_cards(keys):
+    return cache.get_many(keys)
+
+
+def set_card(key, html):
+    # Карточка из отстающей реплики устарела бы под новой версией.
+    if not replica.is_stale():
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
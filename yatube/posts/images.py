@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import gettext_lazy as _
+from PIL import Image, ImageOps
+
+from .models import Post
+
+
+def find_uploaded(upload):
+    """Картинка, уже сохранённая из такого же загруженного файла.
+
+    Хэш загрузки считает core.uploads при приёме. Возвращает имя
+    файла, размеры и заглушку или None.
+    """
+    digest = getattr(upload, 'sha256', None)
+    if digest is None:
+        return None
+    found = (Post
+             .objects
+             .filter(image_upload_hash=digest)
+             .exclude(image='')
+             .values_list(
+                 'image', 'image_width', 'image_height', 'image_placeholder'
+             )
+             .first())
+    if found is None:
+        return None
+    name, width, height, placeholder = found
+    return name, (width, height), placeholder
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def placeholder(image):
+    """Крошечная копия картинки в data URI.
+
+    Растянутая браузером, она размыта и показывается, пока грузится
+    миниатюра.
+    """
+    side = settings.POST_IMAGE_PLACEHOLDER_SIDE
+    width, height = image.size
+    scale = side / max(width, height)
+    small = image.resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        Image.BILINEAR,
+        reducing_gap=2.0
+    )
+    content = io.BytesIO()
+    small.convert('RGB').save(content, 'JPEG', quality=50)
+    encoded = base64.b64encode(content.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def decode(upload):
+    """Открывает картинку, проверяет число пикселей и декодирует её
+    уменьшенной до POST_IMAGE_MAX_SIDE и повёрнутой по EXIF."""
+    with Image.open(upload) as image:
+        width, height = image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                _('Картинка больше %(limit)s мегапикселей.'),
+                code='too_many_pixels',
+                params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6}
+            )
+        side = settings.POST_IMAGE_MAX_SIDE
+        image.thumbnail((side, side))
+        return ImageOps.exif_transpose(image)
+
+
+def normalize(upload):
+    """Проверяет загруженную картинку и перекодирует её для хранения.
+
+    Объём файла и число пикселей проверяются по заголовку, до
+    декодирования: так отсекаются бомбы распаковки. Картинка
+    декодируется сразу уменьшенной до POST_IMAGE_MAX_SIDE, по EXIF
+    поворачивается и сохраняется без метаданных: прогрессивным JPEG
+    или, если есть прозрачность, оптимизированным PNG.
+
+    Возвращает новый файл, его размеры и заглушку для показа до
+    загрузки миниатюры.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_SIZE:
+        raise ValidationError(
+            _('Файл больше %(limit)s.'),
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_SIZE)}
+        )
+    upload.seek(0)
+    try:
+        image = decode(upload)
+    except (OSError, Image.DecompressionBombError):
+        # Заголовок прочитался, а данные обрезаны или испорчены.
+        raise ValidationError(
+            _('Картинка повреждена и не читается.'),
+            code='invalid_image'
+        )
+    icc_profile = image.info.get('icc_profile')
+    content = io.BytesIO()
+    if has_alpha(image):
+        extension = '.png'
+        image.convert('RGBA').save(
+            content, 'PNG', optimize=True, icc_profile=icc_profile
+        )
+    else:
+        extension = '.jpg'
+        image.convert('RGB').save(
+            content,
+            'JPEG',
+            quality=settings.POST_IMAGE_QUALITY,
+            progressive=True,
+            optimize=True,
+            icc_profile=icc_profile
+        )
+    data = content.getvalue()
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    normalized = ContentFile(data, name=name)
+    # Хэш готов, хранилищу не нужно перечитывать файл.
+    normalized.sha256 = hashlib.sha256(data).hexdigest()
+    return normalized, image.size, placeholder(image)
@@ -0,0 +1,15 @@
+from django.urls import reverse
+
+from posts import urls
+
+
+def route_urls(values):
+    """Адреса всех маршрутов posts/urls.py с параметрами из ``values``.
+
+    ``values`` сопоставляет имени параметра маршрута (slug, username,
+    post_id) его значение. Возвращает пары (имя маршрута, адрес).
+    """
+    for pattern in urls.urlpatterns:
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        name = f'{urls.app_name}:{pattern.name}'
+        yield name, reverse(name, kwargs=kwargs)
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from posts import counters, timeline
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стоимость записи и чтения ленты подписок для авторов '
+        'по обе стороны порога FEED_PULL_THRESHOLD. Все данные создаются '
+        'в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=int, default=settings.FEED_PULL_THRESHOLD,
+            help='Порог числа подписчиков для режима pull.'
+        )
+        parser.add_argument(
+            '--followers', type=int, nargs='+',
+            help='Числа подписчиков автора, по умолчанию вокруг порога.'
+        )
+        parser.add_argument('--posts', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        followers = options['followers'] or [
+            max(threshold // 2, 1), threshold, threshold + 1, threshold * 2
+        ]
+        self.stdout.write(
+            f'{"followers":>10} {"mode":>5} {"write ms":>9} '
+            f'{"write q":>8} {"read ms":>8} {"read q":>7}'
+        )
+        with override_settings(FEED_PULL_THRESHOLD=threshold):
+            for count in followers:
+                with transaction.atomic():
+                    self.stdout.write(self.measure(count, options))
+                    transaction.set_rollback(True)
+
+    def measure(self, count, options):
+        author = User.objects.create_user(username=f'bench_author_{count}')
+        User.objects.bulk_create(
+            User(username=f'bench_reader_{count}_{i}') for i in range(count)
+        )
+        readers = User.objects.filter(
+            username__startswith=f'bench_reader_{count}_'
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for reader in readers
+        )
+        counters.rebuild_user(author.pk)
+        reader = readers.first()
+        mode = 'pull' if timeline.is_pulled(author.pk) else 'push'
+
+        write_time, write_queries = self.timed(
+            options['posts'],
+            lambda: Post.objects.create(author=author, text='Тестовый пост')
+        )
+        read_time, read_queries = self.timed(
+            options['repeat'],
+            lambda: list(timeline.feed(reader).page())
+        )
+        return (
+            f'{count:>10} {mode:>5} {write_time:>9.2f} {write_queries:>8} '
+            f'{read_time:>8.2f} {read_queries:>7}'
+        )
+
+    def timed(self, repeat, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = time.perf_counter() - started
+        return elapsed * 1000 / repeat, len(queries) // repeat
@@ -0,0 +1,186 @@
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+from ._routes import route_urls
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты posts/urls.py через тестовый клиент от '
+        'гостя и от читателя с наибольшим числом подписок и печатает '
+        'p50/p95/p99 времени ответа, число SQL-запросов и пик памяти. '
+        'Запросы выполняются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Имя маршрута, например posts:index; можно несколько.'
+        )
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Отключить кэш, чтобы мерить саму сборку страниц.'
+        )
+        parser.add_argument(
+            '--query', default=None,
+            help='Запрос для страницы поиска, по умолчанию слово из поста.'
+        )
+        parser.add_argument(
+            '--output', help='Записать результаты в JSON-файл.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения p95.'
+        )
+
+    def handle(self, *args, **options):
+        values = self.sample_values(options['query'])
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if options['cold_cache']:
+            overrides['CACHES'] = DUMMY_CACHE
+        with override_settings(**overrides), transaction.atomic():
+            results = self.run(values, options)
+            transaction.set_rollback(True)
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'cold_cache': options['cold_cache'],
+            'repeat': options['repeat'],
+            'dataset': {
+                model._meta.model_name: model.objects.count()
+                for model in (Post, Comment, Follow, Group, UserStats)
+            },
+            'results': results,
+        }
+        self.print_table(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def sample_values(self, query):
+        """Самые тяжёлые страницы набора: так видны худшие случаи."""
+        author = UserStats.objects.order_by('-post_count').first()
+        reader = UserStats.objects.order_by('-following_count').first()
+        group = Group.objects.order_by('-post_count').first()
+        post = Post.objects.order_by('-comment_count', '-pk').first()
+        if not (author and reader and group and post):
+            raise CommandError(
+                'Нужны пользователи, группа и пост: запустите generate_data.'
+            )
+        if query is None:
+            words = [word for word in post.text.split() if len(word) > 4]
+            query = words[0] if words else post.text[:10]
+        return {
+            'username': author.user.username,
+            'slug': group.slug,
+            'post_id': post.pk,
+            'reader': reader.user,
+            'query': query,
+        }
+
+    def run(self, values, options):
+        guest = Client()
+        reader = Client()
+        reader.force_login(values['reader'])
+        results = []
+        for name, url in route_urls(values):
+            if options['routes'] and name not in options['routes']:
+                continue
+            data = {'q': values['query']} if name == 'posts:search' else {}
+            for client_name, client in (('guest', guest), ('reader', reader)):
+                results.append({
+                    'route': name,
+                    'url': url,
+                    'client': client_name,
+                    **self.measure(client, url, data, options),
+                })
+        return results
+
+    def measure(self, client, url, data, options):
+        for _ in range(options['warmup']):
+            client.get(url, data)
+        timings = []
+        queries = []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        # Пик памяти меряется отдельным запросом: tracemalloc
+        # замедляет выполнение и исказил бы время.
+        tracemalloc.start()
+        client.get(url, data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def print_table(self, results, compare):
+        baseline = {}
+        if compare:
+            with open(compare, encoding='utf-8') as file:
+                baseline = {
+                    (row['route'], row['client']): row
+                    for row in json.load(file)['results']
+                }
+        self.stdout.write(
+            f'{"route":<24} {"client":<7} {"status":>6} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"queries":>7} {"peak KB":>8}'
+            + (f' {"p95 Δ":>7}' if baseline else '')
+        )
+        for row in results:
+            line = (
+                f'{row["route"]:<24} {row["client"]:<7} {row["status"]:>6} '
+                f'{row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} '
+                f'{row["p99_ms"]:>8.2f} {row["queries"]:>7} '
+                f'{row["peak_kb"]:>8.1f}'
+            )
+            before = baseline.get((row['route'], row['client']))
+            if before and before['p95_ms']:
+                change = row['p95_ms'] / before['p95_ms'] - 1
+                line += f' {change:>+7.0%}'
+            self.stdout.write(line)
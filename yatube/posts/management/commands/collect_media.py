@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from posts.media_gc import Collector
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов и миниатюры sorl, на которые больше '
+        'ничего не ссылается, и устаревшие записи sorl о них. Файлы и '
+        'ссылки читаются потоками по возрастанию имён и сливаются, '
+        'поэтому память не растёт с числом файлов. При --dry-run '
+        'миниатюры, которые освободит удаление записей, не считаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Не больше стольких удалений файлов в секунду.'
+        )
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать файлы моложе стольких секунд '
+                 '(по умолчанию MEDIA_GC_GRACE).'
+        )
+
+    def handle(self, *args, **options):
+        log = None
+        if options['verbosity'] > 1:
+            log = self.stdout.write
+        collector = Collector(
+            dry_run=options['dry_run'],
+            rate=options['rate'],
+            grace=options['grace'],
+            log=log
+        )
+        try:
+            stats = collector.run()
+        except ValueError as error:
+            raise CommandError(error)
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: картинок {stats["images"]}, '
+            f'миниатюр {stats["thumbnails"]} '
+            f'({filesizeformat(stats["bytes"])}), '
+            f'записей sorl {stats["entries"]}.'
+        ))
@@ -0,0 +1,273 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from posts import counters, images, search, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+PREFIX = 'gen_'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Даёт bulk_create записать свои даты в поля с auto_now(_add)."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными: авторы с распределением '
+        'активности по степенному закону, граф подписок с популярными '
+        'авторами, комментарии и картинки. Строки вставляются пачками без '
+        'сигналов, затем пересчитываются счётчики, ленты, поисковый '
+        'индекс и миниатюры. Запускать на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель закона Ципфа для активности и популярности.'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--image-pool', type=int, default=20,
+            help='Сколько разных файлов картинок создать.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            weights = self.zipf_weights(len(users), options['alpha'])
+            pool = self.create_images(options['image_pool'])
+            post_ids = self.create_posts(
+                options['posts'], users, weights, groups,
+                pool, options['images']
+            )
+            self.create_comments(options['comments'], users, post_ids)
+            self.create_follows(options['follows'], users, weights)
+        self.step('Счётчики', counters.rebuild_all)
+        self.step('Ленты', timeline.rebuild_all)
+        self.step('Поисковый индекс', search.rebuild)
+        self.step('Миниатюры', thumbnails.rebuild_all)
+
+    def step(self, title, func):
+        func()
+        self.stdout.write(f'{title}: готово')
+
+    def zipf_weights(self, count, alpha):
+        """Накопленные веса: k-й автор активнее (k+1)-го в ((k+1)/k)^alpha."""
+        return list(accumulate(
+            1 / rank ** alpha for rank in range(1, count + 1)
+        ))
+
+    def pick(self, items, weights, count):
+        return self.random.choices(items, cum_weights=weights, k=count)
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def create_users(self, count):
+        last_pk = self.last_pk(User)
+        password = make_password('password')
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{PREFIX}{last_pk + i}_{self.fake.user_name()}',
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    email=self.fake.email(),
+                    password=password,
+                )
+                for i in range(1, count + 1)
+            ),
+            batch_size=self.batch_size
+        )
+        users = list(User
+                     .objects
+                     .filter(pk__gt=last_pk, username__startswith=PREFIX)
+                     .values_list('pk', flat=True))
+        # Самые активные авторы — случайные, а не первые по id.
+        self.random.shuffle(users)
+        self.stdout.write(f'Пользователи: {len(users)}')
+        return users
+
+    def create_groups(self, count):
+        groups = mixer.cycle(count).blend(
+            Group,
+            title=lambda: self.fake.catch_phrase()[:200],
+            slug=mixer.sequence(lambda i: f'{PREFIX}group-{i}'),
+            description=lambda: self.fake.paragraph()
+        )
+        self.stdout.write(f'Группы: {len(groups)}')
+        return [group.pk for group in groups]
+
+    def create_images(self, count):
+        """Картинки проходят тот же путь, что загруженные через форму.
+
+        Файлы перекодируются и ложатся в хранилище по хэшу; ссылки на
+        них пересчитает counters.rebuild_all. Возвращает пары (имя,
+        поля картинки поста).
+        """
+        storage = Post._meta.get_field('image').storage
+        created = []
+        for i in range(count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (960, 640), color).save(buffer, 'JPEG')
+            image, (width, height), placeholder = images.normalize(
+                ContentFile(buffer.getvalue(), name=f'{PREFIX}{i}.jpg')
+            )
+            created.append((
+                storage.save(f'posts/{image.name}', image),
+                {
+                    'image_width': width,
+                    'image_height': height,
+                    'image_placeholder': placeholder,
+                }
+            ))
+        return created
+
+    def post_date(self, index, count, offset=None):
+        """Даты постов растут вместе с id, как при обычной публикации.
+
+        Пост с номером ``index`` попадает в свой интервал из ``count``
+        равных; ``offset=1`` даёт конец интервала — не раньше поста.
+        """
+        if offset is None:
+            offset = self.random.random()
+        return self.start + (self.now - self.start) * (
+            (index + offset) / count
+        )
+
+    def create_posts(self, count, users, weights, groups, pool, share):
+        def post(pub_date):
+            image, fields = '', {}
+            if pool and self.random.random() < share:
+                image, fields = self.random.choice(pool)
+            return Post(
+                author_id=self.pick(users, weights, 1)[0],
+                group_id=(self.random.choice(groups)
+                          if groups and self.random.random() < 0.5
+                          else None),
+                text=self.fake.text(self.random.randint(50, 1000)),
+                image=image,
+                pub_date=pub_date,
+                updated=pub_date,
+                **fields
+            )
+
+        rows = (
+            post(pub_date)
+            for pub_date in (self.post_date(i, count) for i in range(count))
+        )
+        last_pk = self.last_pk(Post)
+        with explicit_dates(
+            Post._meta.get_field('pub_date'),
+            Post._meta.get_field('updated')
+        ):
+            for batch in self.batches(rows):
+                Post.objects.bulk_create(batch)
+        self.stdout.write(f'Посты: {count}')
+        # Пачки вставляются по порядку, поэтому id новых постов идут подряд.
+        return range(last_pk + 1, self.last_pk(Post) + 1)
+
+    def last_pk(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def create_comments(self, count, users, post_ids):
+        if not post_ids:
+            return
+        total = len(post_ids)
+
+        def comment():
+            # Обсуждают в основном свежие посты, и всегда после публикации.
+            index = total - 1 - int(total * self.random.random() ** 3)
+            published = self.post_date(index, total, offset=1)
+            return Comment(
+                post_id=post_ids[index],
+                author_id=self.random.choice(users),
+                text=self.fake.sentence(),
+                created=published + (
+                    self.now - published
+                ) * self.random.random(),
+            )
+
+        rows = (comment() for _ in range(count))
+        with explicit_dates(Comment._meta.get_field('created')):
+            for batch in self.batches(rows):
+                Comment.objects.bulk_create(batch)
+        self.stdout.write(f'Комментарии: {count}')
+
+    def create_follows(self, average, users, weights):
+        """Число подписок — по Парето, на кого — по популярности автора."""
+        total = 0
+        rows = []
+        for user_id in users:
+            wanted = min(
+                int(self.random.paretovariate(2) * average / 2),
+                len(users) - 1
+            )
+            authors = set(self.pick(users, weights, wanted)) - {user_id}
+            rows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+            if len(rows) >= self.batch_size:
+                Follow.objects.bulk_create(rows)
+                total += len(rows)
+                rows = []
+        Follow.objects.bulk_create(rows)
+        total += len(rows)
+        self.stdout.write(f'Подписки: {total}')
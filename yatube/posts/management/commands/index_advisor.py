@@ -0,0 +1,241 @@
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.query_budget import query_shape
+from posts import counters
+from posts.models import Comment, Follow, Group, Post
+
+from ._routes import route_urls
+
+User = get_user_model()
+
+NEXT_CURSOR = re.compile(
+    r'\?(?:q=[^"&]*&amp;)?cursor=([\w-]+)"[^>]*>\s*Следующая'
+)
+COLUMN = r'"(\w+)"\."(\w+)"'
+# Сравнение столбца со значением, а не с другим столбцом (условие JOIN).
+CONDITION = re.compile(COLUMN + r' (=|IN|IS|<=|>=|<|>) (?!")')
+WHERE = re.compile(r' WHERE (.+?)(?: GROUP BY | ORDER BY | LIMIT |$)')
+ORDER_BY = re.compile(r'ORDER BY (.+?)(?: LIMIT|\)|$)')
+SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+SEARCH = re.compile(
+    r'^SEARCH (?:TABLE )?(\w+) USING (?:COVERING )?INDEX \w+ \((.+)\)'
+)
+TEMP_SORT = 'USE TEMP B-TREE'
+EQUALITY = ('=', 'IN', 'IS')
+
+
+class Command(BaseCommand):
+    help = (
+        'Обходит все адреса posts/urls.py на заполненной базе, снимает '
+        'EXPLAIN QUERY PLAN каждого SELECT и предлагает составные '
+        'индексы против полных сканирований и временных сортировок. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать план каждого проблемного запроса.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write(
+                'EXPLAIN QUERY PLAN разбирается только в SQLite.'
+            )
+            return
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            }}
+        ), transaction.atomic():
+            seeded = self.seed(options['posts'])
+            problems = self.collect(seeded)
+            transaction.set_rollback(True)
+        self.report(problems, options['verbose_plans'])
+
+    def seed(self, count):
+        author = User.objects.create_user(username='advisor_author')
+        reader = User.objects.create_user(username='advisor_reader')
+        group = Group.objects.create(
+            title='Индексы', slug='advisor-group', description='Индексы'
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=group if i % 2 else None, text=f'{i}')
+            for i in range(count)
+        )
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+        counters.rebuild_all()
+        return {
+            'slug': group.slug,
+            'username': author.username,
+            'post_id': post.pk,
+            'reader': reader,
+        }
+
+    def collect(self, seeded):
+        """Запросы с проблемными планами, сгруппированные по форме SQL."""
+        guest = Client()
+        reader = Client()
+        reader.force_login(seeded['reader'])
+        problems = {}
+        for _, url in route_urls(seeded):
+            for client in (guest, reader):
+                for sql in self.visit(client, url):
+                    shape = query_shape(sql)
+                    if shape in problems:
+                        problems[shape]['urls'].add(url)
+                        continue
+                    found = self.explain(sql)
+                    if found:
+                        problems[shape] = {
+                            'sql': sql, 'urls': {url}, **found
+                        }
+        return problems
+
+    def visit(self, client, url):
+        """SQL страницы и следующей страницы курсора, если она есть."""
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        cursor = NEXT_CURSOR.search(response.content.decode())
+        if cursor:
+            with CaptureQueriesContext(connection) as next_queries:
+                client.get(url, {'cursor': cursor.group(1)})
+            queries = list(queries) + list(next_queries)
+        return [
+            query['sql'] for query in queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def explain(self, sql):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+        except DatabaseError:
+            return None
+        scans = {
+            match.group(1) for match in map(SCAN.match, plan)
+            if match and match.group(1) in self.tables()
+        }
+        sorts = [detail for detail in plan if detail.startswith(TEMP_SORT)]
+        partial = set()
+        for match in filter(None, map(SEARCH.match, plan)):
+            table, used = match.groups()
+            if set(self.conditions(sql, table)[0]) - set(
+                re.findall(r'(\w+)[=<>]', used)
+            ):
+                partial.add(table)
+        if not scans and not sorts and not partial:
+            return None
+        return {
+            'plan': plan, 'scans': scans, 'sorts': sorts, 'partial': partial
+        }
+
+    def tables(self):
+        if not hasattr(self, '_tables'):
+            self._tables = {
+                model._meta.db_table: model for model in apps.get_models()
+            }
+        return self._tables
+
+    def conditions(self, sql, table):
+        """Столбцы ``table`` из WHERE: сравнения на равенство и диапазоны."""
+        equal, ranged = [], []
+        where = WHERE.search(sql)
+        for found_table, column, operator in CONDITION.findall(
+            where.group(1) if where else ''
+        ):
+            if found_table != table:
+                continue
+            target = equal if operator in EQUALITY else ranged
+            if column not in target:
+                target.append(column)
+        return equal, ranged
+
+    def propose(self, sql, table):
+        """Индекс: сначала столбцы равенства, затем сортировки и диапазона."""
+        equal, ranged = self.conditions(sql, table)
+        ordered = []
+        order_by = ORDER_BY.search(sql)
+        if order_by:
+            ordered = [
+                column for found_table, column
+                in re.findall(COLUMN, order_by.group(1))
+                if found_table == table
+            ]
+        columns = []
+        for column in equal + ordered + ranged:
+            if column not in columns:
+                columns.append(column)
+        if not columns:
+            return None
+        model = self.tables()[table]
+        by_column = {
+            field.column: field.name for field in model._meta.concrete_fields
+        }
+        if columns == [model._meta.pk.column]:
+            return None
+        fields = tuple(by_column.get(column, column) for column in columns)
+        return model._meta.label, fields
+
+    def report(self, problems, verbose):
+        if not problems:
+            self.stdout.write(self.style.SUCCESS(
+                'Полных сканирований и временных сортировок нет.'
+            ))
+            return
+        proposals = defaultdict(set)
+        for problem in problems.values():
+            kinds = [f'SCAN {table}' for table in sorted(problem['scans'])]
+            kinds += problem['sorts']
+            kinds += [
+                f'индекс {table} покрывает не все условия'
+                for table in sorted(problem['partial'])
+            ]
+            self.stdout.write(self.style.WARNING('; '.join(kinds)))
+            self.stdout.write('  ' + ', '.join(sorted(problem['urls'])))
+            self.stdout.write(f'  {query_shape(problem["sql"])}')
+            if verbose:
+                for detail in problem['plan']:
+                    self.stdout.write(f'    {detail}')
+            tables = problem['scans'] | problem['partial']
+            if problem['sorts']:
+                tables |= self.sorted_tables(problem['sql'])
+            for table in tables:
+                proposal = self.propose(problem['sql'], table)
+                if proposal:
+                    proposals[proposal].update(problem['urls'])
+        if proposals:
+            self.stdout.write('\nПредлагаемые индексы:')
+        for (label, fields), used_by in sorted(proposals.items()):
+            self.stdout.write(
+                f'  {label}: models.Index(fields={list(fields)!r})'
+                f'  # {len(used_by)} адресов'
+            )
+
+    def sorted_tables(self, sql):
+        """Таблицы из ORDER BY запроса с временной сортировкой.
+
+        Сортировку для DISTINCT или GROUP BY без ORDER BY не к чему
+        привязать, для неё таблиц нет.
+        """
+        order_by = ORDER_BY.search(sql)
+        if not order_by:
+            return set()
+        return {
+            table for table, column in re.findall(COLUMN, order_by.group(1))
+            if table in self.tables()
+        }
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок '
+        'по фактическим строкам в базе.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counters.rebuild_all()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,221 @@
+import heapq
+import os
+import time
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.models import StoredFile
+
+from .models import Post
+
+CHUNK_SIZE = 2000
+# sorl пишет записи картинок как {"name": ..., ...}. Если в имени нет
+# экранированных символов (не-ASCII, кавычек, \) и символов меньше
+# кавычки, сортировка по значению — это сортировка по имени файла.
+NAME_PREFIX = '{"name": "'
+PLAIN_NAME = r'^\{"name": "[^"\\ !]*"'
+
+
+def ascending(items, key=lambda item: item):
+    """Пропускает повторы и проверяет, что поток идёт по возрастанию."""
+    previous = None
+    for item in items:
+        current = key(item)
+        if previous is not None and current <= previous:
+            if current == previous:
+                continue
+            raise ValueError(
+                f'Поток не упорядочен: {current!r} после {previous!r}'
+            )
+        previous = current
+        yield item
+
+
+def merge(left, right):
+    """Сливает два упорядоченных по имени потока пар (имя, данные).
+
+    Отдаёт (имя, пара слева, пара справа); отсутствующая сторона — None.
+    В памяти держится по одному элементу каждого потока.
+    """
+    left = ascending(left, key=itemgetter(0))
+    right = ascending(right, key=itemgetter(0))
+    one, other = next(left, None), next(right, None)
+    while one is not None or other is not None:
+        if other is None or (one is not None and one[0] < other[0]):
+            yield one[0], one, None
+            one = next(left, None)
+        elif one is None or other[0] < one[0]:
+            yield other[0], None, other
+            other = next(right, None)
+        else:
+            yield one[0], one, other
+            one, other = next(left, None), next(right, None)
+
+
+def walk(root, directory):
+    """Файлы папки как пары (путь от root, время изменения) по возрастанию.
+
+    Путь сравнивается целиком, поэтому имена вложенных папок при
+    сортировке дополняются '/'. Каждый раз читается одна папка.
+    """
+    path = os.path.join(root, directory)
+    if not os.path.isdir(path):
+        return
+    with os.scandir(path) as scan:
+        entries = sorted(
+            (entry.name + ('/' if entry.is_dir() else ''), entry)
+            for entry in scan
+        )
+    for _, entry in entries:
+        name = f'{directory}/{entry.name}'
+        if entry.is_dir():
+            yield from walk(root, name)
+        else:
+            yield name, entry.stat().st_mtime
+
+
+def referenced_images():
+    names = (Post
+             .objects
+             .exclude(image='')
+             .order_by('image')
+             .values_list('image', flat=True)
+             .distinct()
+             .iterator(chunk_size=CHUNK_SIZE))
+    return ((name, None) for name in names)
+
+
+def kvstore_images(directory):
+    """Записи sorl о картинках из папки: пары (имя, ключ записи).
+
+    Записи с обычными именами читаются потоком в порядке значения.
+    Прочие, например кириллические имена старых загрузок, в JSON
+    идут в другом порядке; их немного, они сортируются в памяти и
+    вливаются в поток.
+    """
+    rows = (KVStoreModel
+            .objects
+            .filter(key__startswith=add_prefix('', 'image'),
+                    value__startswith=f'{NAME_PREFIX}{directory}/')
+            .values_list('key', 'value'))
+    plain = (rows
+             .filter(value__regex=PLAIN_NAME)
+             .order_by('value')
+             .iterator(chunk_size=CHUNK_SIZE))
+    escaped = sorted(
+        (deserialize(value)['name'], key)
+        for key, value in rows.exclude(value__regex=PLAIN_NAME)
+    )
+    return heapq.merge(
+        ((deserialize(value)['name'], key) for key, value in plain),
+        escaped
+    )
+
+
+class Collector:
+    """Удаляет файлы картинок и миниатюр, на которые никто не ссылается.
+
+    Список файлов и список ссылок читаются потоками, упорядоченными
+    по имени, и сливаются. Файлы моложе ``grace`` секунд не трогаются:
+    их пост или запись sorl могут быть ещё не сохранены. Удаления
+    ограничены ``rate`` файлами в секунду; с ``dry_run`` только
+    считаются.
+    """
+
+    def __init__(self, dry_run=False, rate=None, grace=None, log=None):
+        self.dry_run = dry_run
+        self.rate = rate
+        if grace is None:
+            grace = settings.MEDIA_GC_GRACE
+        self.grace = grace
+        self.cutoff = time.time() - grace
+        self.log = log or (lambda message: None)
+        self.images = Post._meta.get_field('image').storage
+        self.last_delete = 0
+        self.stats = dict.fromkeys(
+            ('images', 'thumbnails', 'entries', 'bytes'), 0
+        )
+
+    def run(self):
+        self.collect_entries()
+        self.collect_images()
+        self.collect_thumbnails()
+        return self.stats
+
+    def collect_entries(self):
+        """Записи sorl об исходниках, которых нет ни у одного поста."""
+        for name, entry, post in merge(
+            kvstore_images('posts'), referenced_images()
+        ):
+            if entry is None or post is not None:
+                continue
+            self.log(f'Запись sorl: {name}')
+            source_key = entry[1].rsplit('||', 1)[1]
+            thumbnails = default.kvstore._get(
+                source_key, identity='thumbnails'
+            ) or []
+            keys = [entry[1], add_prefix(source_key, 'thumbnails')]
+            keys.extend(add_prefix(key) for key in thumbnails)
+            self.delete_entries(keys)
+
+    def collect_images(self):
+        for name, file, post in merge(
+            walk(self.images.location, 'posts'), referenced_images()
+        ):
+            if file is not None and post is None:
+                self.delete_file(self.images, name, file[1], 'images')
+        if not self.dry_run:
+            # Счётчики файлов, которых уже нет.
+            StoredFile.objects.filter(
+                refs=0, updated__lt=timezone.now() - timedelta(
+                    seconds=self.grace
+                )
+            ).delete()
+
+    def collect_thumbnails(self):
+        directory = sorl_settings.THUMBNAIL_PREFIX.rstrip('/')
+        for name, file, entry in merge(
+            walk(default.storage.location, directory),
+            kvstore_images(directory)
+        ):
+            if entry is None:
+                self.delete_file(
+                    default.storage, name, file[1], 'thumbnails'
+                )
+            elif file is None:
+                self.log(f'Запись sorl без файла: {name}')
+                self.delete_entries([entry[1]])
+
+    def delete_entries(self, keys):
+        self.stats['entries'] += len(keys)
+        if not self.dry_run:
+            default.kvstore._delete_raw(*keys)
+
+    def delete_file(self, storage, name, mtime, kind):
+        if mtime > self.cutoff:
+            return
+        self.log(f'Файл: {name}')
+        self.stats[kind] += 1
+        self.stats['bytes'] += storage.size(name)
+        if self.dry_run:
+            return
+        self.throttle()
+        storage.delete(name)
+        if kind == 'images':
+            StoredFile.objects.filter(name=name).delete()
+
+    def throttle(self):
+        if not self.rate:
+            return
+        delay = self.last_delete + 1 / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.last_delete = time.monotonic()
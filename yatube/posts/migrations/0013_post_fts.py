@@ -0,0 +1,45 @@
+from django.db import migrations
+
+from posts.stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+        'text, group_title, group_description, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    for post in Post.objects.select_related('group').iterator():
+        group = post.group
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} '
+            '(rowid, text, group_title, group_description) '
+            'VALUES (%s, %s, %s, %s)',
+            [
+                post.pk,
+                ' '.join(stems(post.text)),
+                ' '.join(stems(group.title)) if group else '',
+                ' '.join(stems(group.description)) if group else '',
+            ]
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.expressions
+
+
+def count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(**{field: OuterRef('user')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0)
+    )
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет первую подписку каждой пары и убирает подписки на себя."""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = (Follow.objects
+                  .values('user', 'author')
+                  .annotate(first=Min('pk'), total=Count('pk'))
+                  .filter(total__gt=1)
+                  .order_by())
+    users = set()
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(pk=row['first']).delete()
+        users.update((row['user'], row['author']))
+    self_follows = Follow.objects.filter(user=F('author'))
+    users.update(self_follows.values_list('user', flat=True))
+    self_follows.delete()
+    if users:
+        UserStats.objects.filter(user__in=users).update(
+            follower_count=count(Follow.objects, 'author'),
+            following_count=count(Follow.objects, 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_user_author_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='follow_not_self'),
+        ),
+    ]
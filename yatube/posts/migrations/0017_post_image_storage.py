@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:02
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_refs(apps, schema_editor):
+    """Заводит счётчики ссылок на уже загруженные картинки."""
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    refs = (Post.objects
+            .exclude(image='')
+            .values('image')
+            .annotate(total=Count('pk'))
+            .order_by())
+    StoredFile.objects.bulk_create(
+        (StoredFile(name=row['image'], refs=row['total']) for row in refs),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+        ('posts', '0016_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_image_refs, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,66 @@
+import json
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
 
-class Group(models.Model):
+class AtomicSaveMixin:
+    """Сохраняет строку вместе с обработчиками post_save в одной транзакции.
+
+    Обработчики поддерживают счётчики и ленты, поэтому они не должны
+    разойтись с самой строкой при ошибке.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики устаревшими значениями при сохранении.
+
+    Счётчики меняются только через ``F()``-обновления, поэтому обычный
+    ``save()`` загруженной строки пишет все поля, кроме них. Так же
+    защищаются и другие поля, которые пишутся в обход ``save()``.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding
+                and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(
         unique=True
     )
     description = models.TextField()
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('post_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, AtomicSaveMixin, models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -34,18 +76,68 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        # По имени файла ищутся посты с той же картинкой.
+        db_index=True
+    )
+    # Размеры сохранённой картинки, их пишет PostForm: миниатюрам не
+    # нужно открывать исходник, чтобы узнать размер.
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
     )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    # Крошечная копия картинки в data URI, видна до загрузки миниатюры.
+    image_placeholder = models.TextField(blank=True, editable=False)
+    # sha256 загруженного файла до перекодирования: по нему повторная
+    # загрузка находит готовую картинку, не декодируя её заново.
+    image_upload_hash = models.CharField(
+        max_length=64, blank=True, editable=False, db_index=True
+    )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Адреса готовых миниатюр картинки, их пишет posts.thumbnails.
+    thumbnails = models.TextField(default='', editable=False)
+
+    counter_fields = ('comment_count', 'thumbnails')
 
     class Meta:
         ordering = ["-pub_date"]
         get_latest_by = ['text']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.COUNT_POSTS]
 
+    @property
+    def thumbnail_urls(self):
+        """Миниатюры текущей картинки по названиям размеров.
 
-class Comment(models.Model):
+        Миниатюры сменённой картинки не отдаются, пока не готовы новые.
+        """
+        if not self.thumbnails:
+            return {}
+        stored = json.loads(self.thumbnails)
+        if stored['source'] != self.image.name:
+            return {}
+        return stored['urls']
+
+
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -59,11 +151,78 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:settings.COUNT_POSTS]
 
 
-class Follow(models.Model):
+class FollowManager(models.Manager):
+    """Подписка и отписка одной командой SQL без чтения перед записью.
+
+    Повтор запроса ничего не меняет: уникальность пары проверяет база.
+    Сигналы отправляются, только если строка действительно появилась
+    или исчезла, поэтому счётчики и ленты не сдвигаются дважды.
+    """
+
+    def _execute(self, using, sql, params):
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount, cursor.lastrowid
+
+    def follow(self, user, author):
+        """INSERT ... ON CONFLICT DO NOTHING; True, если подписка новая."""
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        sql = '{} {} ({}, {}) VALUES (%s, %s) {}'.format(
+            connection.ops.insert_statement(ignore_conflicts=True),
+            quote(self.model._meta.db_table),
+            quote('user_id'),
+            quote('author_id'),
+            connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+        )
+        with transaction.atomic(using=using):
+            inserted, pk = self._execute(using, sql, [user.pk, author.pk])
+            if not inserted:
+                return False
+            follow = self.model(pk=pk, user=user, author=author)
+            follow._state.adding = False
+            follow._state.db = using
+            post_save.send(
+                sender=self.model, instance=follow, created=True,
+                update_fields=None, raw=False, using=using
+            )
+        return True
+
+    def unfollow(self, user, author):
+        """Один DELETE по паре; True, если подписка была."""
+        using = router.db_for_write(self.model)
+        quote = connections[using].ops.quote_name
+        sql = 'DELETE FROM {} WHERE {} = %s AND {} = %s'.format(
+            quote(self.model._meta.db_table),
+            quote('user_id'),
+            quote('author_id')
+        )
+        with transaction.atomic(using=using):
+            deleted, _ = self._execute(using, sql, [user.pk, author.pk])
+            if not deleted:
+                return False
+            post_delete.send(
+                sender=self.model,
+                instance=self.model(user=user, author=author),
+                using=using
+            )
+        return True
+
+
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -74,3 +233,62 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    objects = FollowManager()
+
+    class Meta:
+        # Индекс уникальности (user, author) заменяет обычный индекс пары.
+        unique_together = ('user', 'author')
+        constraints = [
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Поддерживаемые счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
@@ -0,0 +1,150 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.encoding import iri_to_uri
+
+from core.db import replica
+
+from . import versions
+from .models import Group, Post
+from .paginator import CURSOR_PARAM, NEXT, decode_cursor
+
+VERSION_KEY = 'page_version:{}'
+
+
+def index_scopes(request):
+    # Новый пост меняет только начало ленты: страницы после курсора
+    # вперёд выбираются по ключу и от новых постов не зависят. Страница
+    # назад отсчитывается от курсора к началу и сдвигается новым постом.
+    cursor = decode_cursor(request.GET.get(CURSOR_PARAM, ''))
+    if cursor is not None and cursor[0] == NEXT:
+        return ['index']
+    return ['index', 'index:head']
+
+
+def group_scopes(request, slug):
+    return [f'group:{slug}']
+
+
+def profile_scopes(request, username):
+    return [f'profile:{username}']
+
+
+def post_scopes(request, post_id):
+    return [f'post:{post_id}']
+
+
+def scope_versions(scopes):
+    """Текущие версии областей страницы, в порядке ``scopes``."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    current = versions.get_many(keys)
+    return [str(current[key]) for key in keys]
+
+
+def expire(*scopes):
+    versions.bump(*(VERSION_KEY.format(scope) for scope in scopes))
+
+
+def _group_scopes(*group_ids):
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    return [f'group:{slug}' for slug in slugs]
+
+
+def expire_post(post, created, old_group_id=None):
+    """Сбрасывает страницы, на которых виден пост.
+
+    Новый пост попадает только в начало ленты, его группу и профиль
+    автора; правка или удаление задевают любую страницу с ним.
+    """
+    scopes = [f'profile:{post.author.username}']
+    if post.group_id is not None:
+        # Группу поста форма уже загрузила, отдельный запрос не нужен.
+        scopes.append(f'group:{post.group.slug}')
+    if old_group_id not in (None, post.group_id):
+        scopes.extend(_group_scopes(old_group_id))
+    if created:
+        expire('index:head', *scopes)
+    else:
+        expire('index', f'post:{post.pk}', *scopes)
+
+
+def _post_scopes(posts):
+    return [f'post:{pk}' for pk in posts.values_list('pk', flat=True)]
+
+
+def expire_author(author, old_username=None):
+    """Сбрасывает страницы с карточкой автора: ленты, его профиль и
+    страницы постов, которые он написал или прокомментировал.
+
+    ``old_username`` — прежнее имя после переименования: страницы
+    профиля под ним тоже больше не верны.
+    """
+    group_ids = (Post
+                 .objects
+                 .filter(author=author, group__isnull=False)
+                 .values_list('group_id', flat=True)
+                 .distinct())
+    posts = Post.objects.filter(
+        Q(author=author) | Q(comments__author=author)
+    ).distinct()
+    usernames = {author.username, old_username} - {None}
+    expire(
+        'index',
+        *(f'profile:{username}' for username in usernames),
+        *_group_scopes(*group_ids),
+        *_post_scopes(posts),
+    )
+
+
+def expire_group(group, old_slug=None):
+    """Сбрасывает страницы со ссылкой на группу: ленты, её страницу,
+    страницы её постов и профили их авторов."""
+    slugs = {group.slug, old_slug} - {None}
+    posts = Post.objects.filter(group=group)
+    usernames = (posts
+                 .order_by()
+                 .values_list('author__username', flat=True)
+                 .distinct())
+    expire(
+        'index',
+        *(f'group:{slug}' for slug in slugs),
+        *(f'profile:{username}' for username in usernames),
+        *_post_scopes(posts),
+    )
+
+
+def cache_anonymous(scopes):
+    """Кэширует ответ view целиком для анонимных GET-запросов.
+
+    ``scopes(request, **kwargs)`` называет области, от которых зависит
+    страница; их версии входят в ключ, и expire() по области
+    сбрасывает только её страницы. Авторизованные пользователи всегда
+    получают свежий ответ с их шапкой и переключателем лент.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(
+                iri_to_uri(request.get_full_path()).encode()
+            ).hexdigest()
+            key = ':'.join(
+                ['page', path]
+                + scope_versions(scopes(request, *args, **kwargs))
+            )
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if (response.status_code == 200 and not response.cookies
+                        and not replica.is_stale()):
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -1,10 +1,177 @@
-from django.core.paginator import Paginator
+import heapq
+from itertools import islice
+
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, position, pk):
+    """Упаковывает ключ (position, pk) в непрозрачный токен."""
+    raw = f'{direction}|{position}|{pk}'
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token):
+    """Возвращает (direction, position, pk) или None для битого токена."""
+    try:
+        raw = force_str(urlsafe_base64_decode(token))
+        direction, position, pk = raw.split('|')
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    return direction, position, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, pk).
+
+    Вместо COUNT(*) и OFFSET каждая страница выбирается одним запросом
+    ``WHERE (pub_date, id) < (...) ORDER BY pub_date DESC, id DESC
+    LIMIT per_page + 1``, поэтому её стоимость не зависит от глубины.
+    Страница остаётся обычным ``Page``, ссылки на соседние страницы
+    лежат в ``page.next_cursor`` и ``page.previous_cursor``.
+
+    ``key`` задаёт пару полей (дата, уникальный id), по которой
+    упорядочен ``object_list``; по умолчанию это ``(pub_date, pk)`` поста.
+    """
+
+    def __init__(self, object_list, per_page, key=('pub_date', 'pk'),
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key = key
+
+    def dump_position(self, value):
+        return value.isoformat()
+
+    def load_position(self, raw):
+        """Значение ключа из курсора; None, если курсор битый."""
+        try:
+            return parse_datetime(raw)
+        except ValueError:
+            return None
+
+    def decode(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return None
+        direction, position, pk = decoded
+        position = self.load_position(position)
+        if position is None:
+            return None
+        return direction, position, pk
+
+    def page(self, cursor=None):
+        decoded = self.decode(cursor)
+        if decoded is None:
+            rows = self.fetch_after(None)
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            direction, pub_date, pk = decoded
+            if direction == NEXT:
+                rows = self.fetch_after((pub_date, pk))
+                has_next, has_previous = len(rows) > self.per_page, True
+                rows = rows[:self.per_page]
+            else:
+                rows = self.fetch_before((pub_date, pk))
+                has_next, has_previous = True, len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+            if not rows:
+                # Курсор указывает за край ленты: отдаём её начало.
+                return self.page()
+        page = self._get_page(rows, 1, self)
+        page.next_cursor = (
+            self._cursor(NEXT, rows[-1]) if has_next and rows else None
+        )
+        page.previous_cursor = (
+            self._cursor(PREVIOUS, rows[0]) if has_previous else None
+        )
+        return page
+
+    def item_key(self, item):
+        """Ключ (дата, id) элемента страницы."""
+        date_field, id_field = self.key
+        return getattr(item, date_field), getattr(item, id_field)
+
+    def _cursor(self, direction, item):
+        position, pk = self.item_key(item)
+        return encode_cursor(direction, self.dump_position(position), pk)
+
+    def get_page(self, cursor):
+        return self.page(cursor)
+
+    def _seek(self, key, lookup):
+        date_field, id_field = self.key
+        pub_date, pk = key
+        return (
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk})
+        )
+
+    def fetch_after(self, key):
+        """До per_page + 1 элементов старше ключа, от новых к старым."""
+        date_field, id_field = self.key
+        queryset = self.object_list
+        if key is not None:
+            queryset = queryset.filter(self._seek(key, 'lt'))
+        queryset = queryset.order_by(f'-{date_field}', f'-{id_field}')
+        return list(queryset[:self.per_page + 1])
+
+    def fetch_before(self, key):
+        """До per_page + 1 элементов новее ключа, от старых к новым."""
+        date_field, id_field = self.key
+        queryset = (self.object_list
+                    .filter(self._seek(key, 'gt'))
+                    .order_by(date_field, id_field))
+        return list(queryset[:self.per_page + 1])
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Сливает несколько курсорных пагинаторов с общим ключом.
+
+    Каждый источник отдаёт не больше per_page + 1 элементов после
+    курсора, поэтому страница стоит по одному запросу на источник.
+    """
+
+    def __init__(self, sources, per_page):
+        super().__init__(sources, per_page)
+        self.sources = sources
+
+    @cached_property
+    def count(self):
+        return sum(source.count for source in self.sources)
+
+    def item_key(self, item):
+        return self.sources[0].item_key(item)
+
+    def _merge(self, rows, reverse):
+        merged = heapq.merge(*rows, key=self.item_key, reverse=reverse)
+        return list(islice(merged, self.per_page + 1))
+
+    def fetch_after(self, key):
+        return self._merge(
+            (source.fetch_after(key) for source in self.sources), True
+        )
+
+    def fetch_before(self, key):
+        return self._merge(
+            (source.fetch_before(key) for source in self.sources), False
+        )
 
 
-def paginator(request, name):
-    create_paginator = Paginator(name, settings.COUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = create_paginator.get_page(page_number)
+def paginator(request, name, **kwargs):
+    create_paginator = CursorPaginator(name, settings.COUNT_POSTS, **kwargs)
+    page_obj = create_paginator.get_page(request.GET.get(CURSOR_PARAM))
 
     return page_obj
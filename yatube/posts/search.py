@@ -0,0 +1,161 @@
+from django.db import connection, transaction
+from django.utils.functional import cached_property
+
+from .models import Post
+from .paginator import CursorPaginator
+from .stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+# Веса bm25 для колонок: текст поста, название и описание группы.
+WEIGHTS = (1.0, 0.5, 0.25)
+
+
+def enabled():
+    """FTS5 есть только в SQLite: на других базах индекс не ведётся."""
+    return connection.vendor == 'sqlite'
+
+
+def _document(post, group):
+    return [
+        ' '.join(stems(post.text)),
+        ' '.join(stems(group.title)) if group else '',
+        ' '.join(stems(group.description)) if group else '',
+    ]
+
+
+def index_post(post):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} '
+            '(rowid, text, group_title, group_description) '
+            'VALUES (%s, %s, %s, %s)',
+            [post.pk, *_document(post, post.group)]
+        )
+
+
+def unindex_post(post_id):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def reindex_group(group):
+    if not enabled():
+        return
+    for post in Post.objects.filter(group=group).select_related('group'):
+        index_post(post)
+
+
+def rebuild(batch_size=1000):
+    """Заново строит индекс, например после bulk_create без сигналов."""
+    if not enabled():
+        return
+    posts = Post.objects.select_related('group').iterator(
+        chunk_size=batch_size
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for post in posts:
+            batch.append([post.pk, *_document(post, post.group)])
+            if len(batch) == batch_size:
+                _insert_many(cursor, batch)
+                batch = []
+        _insert_many(cursor, batch)
+
+
+def _insert_many(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} '
+            '(rowid, text, group_title, group_description) '
+            'VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def match_expression(query):
+    """Запрос FTS5: все основы слов запроса как префиксы, через AND.
+
+    Основы состоят только из букв и цифр, поэтому кавычки
+    в выражение не попадают.
+    """
+    return ' '.join(f'"{word}"*' for word in stems(query))
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсор по (релевантность bm25, id) поверх результатов FTS5."""
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page)
+        self.match = match_expression(query) if enabled() else ''
+
+    @cached_property
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def dump_position(self, value):
+        return repr(value)
+
+    def load_position(self, raw):
+        try:
+            return float(raw)
+        except ValueError:
+            return None
+
+    def item_key(self, post):
+        return post.search_score, post.pk
+
+    def _search(self, condition, params, order):
+        if not self.match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, score FROM ('
+                f'  SELECT rowid, bm25({FTS_TABLE}, %s, %s, %s) AS score'
+                f'  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+                f') WHERE {condition} '
+                f'ORDER BY score {order}, rowid {order} LIMIT %s',
+                [*WEIGHTS, self.match, *params, self.per_page + 1]
+            )
+            scores = dict(cursor.fetchall())
+        posts = (Post
+                 .objects
+                 .select_related('author', 'group')
+                 .in_bulk(scores))
+        found = []
+        for post_id, score in scores.items():
+            if post_id in posts:
+                posts[post_id].search_score = score
+                found.append(posts[post_id])
+        return found
+
+    def fetch_after(self, key):
+        """Следующие по релевантности: bm25 меньше — совпадение лучше."""
+        if key is None:
+            return self._search('1', [], 'ASC')
+        score, pk = key
+        return self._search(
+            'score > %s OR (score = %s AND rowid > %s)',
+            [score, score, pk],
+            'ASC'
+        )
+
+    def fetch_before(self, key):
+        score, pk = key
+        return self._search(
+            'score < %s OR (score = %s AND rowid < %s)',
+            [score, score, pk],
+            'DESC'
+        )
@@ -0,0 +1,223 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from sorl.thumbnail import default
+
+from core import storage
+
+from . import (
+    counters, follow_graph, fragments, page_cache, search, tasks, timeline
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_saved_username(sender, instance, **kwargs):
+    instance._saved_username = None
+    if instance.pk is not None:
+        instance._saved_username = (User
+                                    .objects
+                                    .filter(pk=instance.pk)
+                                    .values_list('username', flat=True)
+                                    .first())
+
+
+@receiver(post_save, sender=User)
+def expire_author_cards(sender, instance, created, update_fields, **kwargs):
+    if not created and (
+        update_fields is None or CARD_USER_FIELDS & set(update_fields)
+    ):
+        fragments.bump('author', instance.pk)
+        page_cache.expire_author(instance, instance._saved_username)
+
+
+@receiver(post_delete, sender=User)
+def expire_deleted_author_pages(sender, instance, **kwargs):
+    fragments.bump('author', instance.pk)
+    page_cache.expire('index', f'profile:{instance.username}')
+
+
+@receiver(pre_save, sender=Group)
+def remember_saved_slug(sender, instance, **kwargs):
+    instance._saved_slug = None
+    if instance.pk is not None:
+        instance._saved_slug = (Group
+                                .objects
+                                .filter(pk=instance.pk)
+                                .values_list('slug', flat=True)
+                                .first())
+
+
+@receiver(post_save, sender=Group)
+def expire_group_cards(sender, instance, created, **kwargs):
+    if not created:
+        fragments.bump('group', instance.pk)
+        page_cache.expire_group(instance, instance._saved_slug)
+
+
+@receiver(pre_delete, sender=Group)
+def expire_deleted_group_pages(sender, instance, **kwargs):
+    # Посты группы остаются без неё через UPDATE, без сигналов, поэтому
+    # их страницы находим до удаления.
+    fragments.bump('group', instance.pk)
+    page_cache.expire_group(instance)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_posts(sender, instance, created, **kwargs):
+    if not created:
+        tasks.reindex_group.delay(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_fields(sender, instance, **kwargs):
+    instance._saved_group_id = None
+    instance._saved_image = ''
+    if instance.pk is not None:
+        saved = (Post
+                 .objects
+                 .filter(pk=instance.pk)
+                 .values_list('group_id', 'image')
+                 .first())
+        if saved is not None:
+            instance._saved_group_id, instance._saved_image = saved
+
+
+@receiver(post_save, sender=Post)
+def process_post(sender, instance, created, **kwargs):
+    tasks.process_post.delay(instance.pk, created)
+
+
+@receiver(post_save, sender=Post)
+def generate_thumbnails(sender, instance, **kwargs):
+    if instance.image.name == instance._saved_image:
+        return
+    # Под прежним именем может оказаться другой файл, а записи sorl
+    # о нём ещё лежат в памяти процесса и в кэше.
+    default.kvstore.evict(instance._saved_image, instance.image.name)
+    if instance.image:
+        tasks.generate_thumbnails.delay(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    if instance.image.name != instance._saved_image:
+        storage.release(instance._saved_image)
+        storage.retain(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'post_count', 1)
+        counters.bump_group(instance.group_id, 1)
+    elif instance._saved_group_id != instance.group_id:
+        counters.bump_group(instance._saved_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_card(sender, instance, **kwargs):
+    fragments.bump('post', instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def expire_post_pages(sender, instance, created, **kwargs):
+    page_cache.expire_post(instance, created, instance._saved_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def expire_deleted_post_pages(sender, instance, **kwargs):
+    page_cache.expire_post(instance, created=False)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'post_count', -1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_comment_pages(sender, instance, **kwargs):
+    page_cache.expire(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        tasks.backfill_timeline.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'follower_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_save, sender=Follow)
+def add_to_follow_graph(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_from_follow_graph(sender, instance, **kwargs):
+    follow_graph.unfollowed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'follower_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+
+
+# Регистрируются после пересчёта счётчиков и видят новое число
+# подписчиков.
+@receiver(post_save, sender=Follow)
+def switch_to_pull(sender, instance, created, **kwargs):
+    if created and timeline.crossed_threshold(instance.author_id, 1):
+        tasks.rebuild_author_timelines.delay(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def switch_to_push(sender, instance, **kwargs):
+    if timeline.crossed_threshold(instance.author_id, -1):
+        tasks.rebuild_author_timelines.delay(instance.author_id)
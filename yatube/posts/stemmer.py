@@ -0,0 +1,125 @@
+"""Стеммер Snowball для русского языка.
+
+Используется полнотекстовым поиском: токенизатор FTS5 unicode61
+не знает русской морфологии, поэтому в индекс и в запрос попадают
+основы слов. Модуль не зависит от Django и импортируется миграциями.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+WORDS = re.compile(r'\w+')
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом',
+     'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я'),
+)
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+DERIVATIONAL = ((), ('ост', 'ость'))
+
+
+def _regions(word):
+    """Начала областей RV и R2 по правилам Snowball."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, groups):
+    """Снимает самое длинное окончание из ``groups`` внутри word[start:].
+
+    Окончания первой группы снимаются, только если перед ними а или я.
+    Возвращает новое слово или None, если окончание не найдено.
+    """
+    preceded, plain = groups
+    region = word[start:]
+    ending = max(
+        (e for e in preceded + plain if region.endswith(e)),
+        key=len,
+        default=None
+    )
+    if ending is None:
+        return None
+    stem = word[:-len(ending)]
+    if ending in plain:
+        return stem
+    if len(region) > len(ending) and stem[-1] in 'ая':
+        return stem
+    return None
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    # Словарь текстов невелик по сравнению с их объёмом, поэтому
+    # основы кэшируются: переиндексация не разбирает слово дважды.
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    stripped = _strip(word, rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stripped = _strip(word, rv, ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip(stripped, rv, PARTICIPLE) or stripped
+        else:
+            stripped = (_strip(word, rv, VERB)
+                        or _strip(word, rv, NOUN))
+    word = stripped or word
+
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+    word = _strip(word, max(r2, rv), DERIVATIONAL) or word
+
+    if word[rv:].endswith('нн'):
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative
+            if word[rv:].endswith('нн'):
+                word = word[:-1]
+        elif word[rv:].endswith('ь'):
+            word = word[:-1]
+    return word
+
+
+def stems(text):
+    """Основы всех слов текста, в порядке появления."""
+    return [stem(word) for word in WORDS.findall(text or '')]
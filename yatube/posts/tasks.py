@@ -0,0 +1,42 @@
+from core.jobs import task
+
+from . import search, thumbnails, timeline
+from .models import Follow, Group, Post
+
+
+@task
+def process_post(post_id, created):
+    """Раскладывает новый пост по лентам и обновляет поисковый индекс.
+
+    К моменту выполнения пост могут удалить, а подписку — отменить,
+    поэтому задачи перечитывают строки по id.
+    """
+    post = Post.objects.select_related('group').filter(pk=post_id).first()
+    if post is None:
+        return
+    if created:
+        timeline.push_post(post)
+    search.index_post(post)
+
+
+@task
+def backfill_timeline(user_id, author_id):
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.backfill(user_id, author_id)
+
+
+@task
+def rebuild_author_timelines(author_id):
+    timeline.rebuild_author(author_id)
+
+
+@task
+def reindex_group(group_id):
+    group = Group.objects.filter(pk=group_id).first()
+    if group is not None:
+        search.reindex_group(group)
+
+
+@task
+def generate_thumbnails(post_id):
+    thumbnails.store(post_id)
@@ -0,0 +1,70 @@
+from django import template
+
+from posts import follow_graph, fragments
+
+register = template.Library()
+
+# Первая карточка страницы кэшируется отдельно: её картинка — самая
+# крупная на первом экране и грузится без loading="lazy".
+FIRST = ':first'
+
+
+class PostCardNode(template.Node):
+    def __init__(self, nodelist, post, variant):
+        self.nodelist = nodelist
+        self.post = post
+        self.variant = variant
+
+    def page_cards(self, context, post, variant):
+        """Ключи и готовые карточки всей страницы, читаются один раз."""
+        state = context.render_context.setdefault(self, {})
+        if variant not in state:
+            posts = list(context.get('page_obj') or [post])
+            keys = fragments.card_keys(posts, variant)
+            wanted = [*keys.values(), keys[posts[0].pk] + FIRST]
+            state[variant] = (keys, fragments.get_cards(wanted))
+        keys, cards = state[variant]
+        if post.pk not in keys:
+            keys.update(fragments.card_keys([post], variant))
+        return keys[post.pk], cards
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        variant = self.variant.resolve(context)
+        key, cards = self.page_cards(context, post, variant)
+        if (context.get('forloop') or {}).get('first'):
+            key += FIRST
+        html = cards.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.set_card(key, html)
+        return html
+
+
+@register.tag
+def post_card(parser, token):
+    """Кэширует карточку поста по id и версиям поста, автора и группы.
+
+    Использование: ``{% post_card post "index" %}...{% endpost_card %}``.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает пост и название варианта карточки'
+        )
+    nodelist = parser.parse(('endpost_card',))
+    parser.delete_first_token()
+    return PostCardNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2])
+    )
+
+
+@register.filter
+def followed_by(author_id, user):
+    """``{% if post.author_id|followed_by:user %}`` без запроса к базе.
+
+    Зависит от читателя, поэтому ставится вне блока {% post_card %}.
+    """
+    return follow_graph.is_following(user, author_id)
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+
+from ..models import Comment, Follow, Post, TimelineEntry, UserStats
+from ..search import SearchPaginator
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data',
+            '--users', '30', '--groups', '3', '--posts', '200',
+            '--comments', '100', '--follows', '5', '--image-pool', '1',
+            stdout=StringIO()
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generated_data_is_consistent(self):
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        post_counts = list(UserStats
+                           .objects
+                           .order_by('-post_count')
+                           .values_list('post_count', flat=True))
+        self.assertEqual(sum(post_counts), 200)
+        # Активность авторов неравномерна: лидер пишет больше медианы.
+        self.assertGreater(post_counts[0], post_counts[len(post_counts) // 2])
+        follow = Follow.objects.first()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user_id=follow.user_id, author_id=follow.author_id
+        ).exists())
+        post = Post.objects.first()
+        self.assertIn(
+            post,
+            SearchPaginator(post.text.split()[0], 200).page()
+        )
+        for comment in Comment.objects.select_related('post')[:20]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_generated_images_look_uploaded(self):
+        posts = Post.objects.exclude(image='')
+        self.assertTrue(posts.exists())
+        post = posts.first()
+        self.assertRegex(post.image.name, r'^posts/\w\w/\w{64}\.jpg$')
+        self.assertEqual((post.image_width, post.image_height), (960, 640))
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).refs,
+            posts.filter(image=post.image.name).count()
+        )
+
+    def test_bench_writes_results(self):
+        output = os.path.join(TEMP_MEDIA_ROOT, 'bench.json')
+        call_command(
+            'bench_views', '--repeat', '2', '--warmup', '0',
+            '--route', 'posts:index', '--route', 'posts:post_detail',
+            '--output', output, stdout=StringIO()
+        )
+        with open(output, encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertEqual(report['dataset']['post'], 200)
+        self.assertEqual(
+            {(row['route'], row['client']) for row in report['results']},
+            {
+                ('posts:index', 'guest'), ('posts:index', 'reader'),
+                ('posts:post_detail', 'guest'),
+                ('posts:post_detail', 'reader'),
+            }
+        )
+        for row in report['results']:
+            self.assertEqual(row['status'], 200)
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
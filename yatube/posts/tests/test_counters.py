@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='name')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='first',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='second',
+            description='Тестовое описание'
+        )
+
+    def assertCounts(self, user, **expected):
+        stats = counters.user_stats(User.objects.get(pk=user.pk))
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_counters_follow_rows(self):
+        post = Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounts(self.user, post_count=1, follower_count=1)
+        self.assertCounts(self.reader, following_count=1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 1)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).post_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(Group.objects.get(pk=self.group.pk).post_count, 0)
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).post_count, 1
+        )
+
+        follow.delete()
+        post.delete()
+        self.assertCounts(self.user, post_count=0, follower_count=0)
+        self.assertCounts(self.reader, following_count=0)
+
+    def test_rebuild_command(self):
+        Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group
+        )
+        UserStats.objects.all().delete()
+        Group.objects.update(post_count=10)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounts(self.user, post_count=1)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).post_count, 1)
+
+    def test_post_detail_does_not_load_author_posts(self):
+        post = Post.objects.create(author=self.user, text='Тестовый текст')
+        response = self.client.get(f'/posts/{post.pk}/')
+        self.assertEqual(response.context['post_count'], 1)
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import Follow, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class FollowManagerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_follow_is_idempotent(self):
+        self.assertTrue(Follow.objects.follow(self.reader, self.author))
+        self.assertFalse(Follow.objects.follow(self.reader, self.author))
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 1
+        )
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+    def test_unfollow_is_idempotent(self):
+        Follow.objects.follow(self.reader, self.author)
+        self.assertTrue(Follow.objects.unfollow(self.reader, self.author))
+        self.assertFalse(Follow.objects.unfollow(self.reader, self.author))
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_single_write_statement(self):
+        with CaptureQueriesContext(connection) as captured:
+            Follow.objects.follow(self.reader, self.author)
+        follow_writes = [
+            query['sql'] for query in captured
+            if Follow._meta.db_table in query['sql']
+            and not query['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(len(follow_writes), 1)
+        self.assertTrue(follow_writes[0].startswith('INSERT'))
+        with CaptureQueriesContext(connection) as captured:
+            Follow.objects.follow(self.reader, self.author)
+        self.assertFalse(any(
+            query['sql'].startswith('UPDATE') for query in captured
+        ))
+
+    def test_follow_fills_timeline(self):
+        post = self.author.posts.create(text='Пост')
+        Follow.objects.follow(self.reader, self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        Follow.objects.unfollow(self.reader, self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_database_rejects_duplicates_and_self_follow(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for author in (self.author, self.reader):
+            with self.subTest(author=author.username):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    Follow.objects.create(user=self.reader, author=author)
+
+
+class FollowJsonTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = reverse(
+            'posts:profile_following', args=[self.author.username]
+        )
+
+    def test_follow_and_unfollow(self):
+        for method, following, followers in (
+            ('post', True, 1),
+            ('post', True, 1),
+            ('get', True, 1),
+            ('delete', False, 0),
+            ('delete', False, 0),
+        ):
+            with self.subTest(method=method):
+                response = getattr(self.client, method)(self.url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json(),
+                    {'following': following, 'followers': followers}
+                )
+
+    def test_self_follow_is_ignored(self):
+        response = self.client.post(
+            reverse('posts:profile_following', args=[self.reader.username])
+        )
+        self.assertFalse(response.json()['following'])
+        self.assertFalse(Follow.objects.exists())
+
+    def test_guest_gets_401(self):
+        response = Client().post(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(counters.user_stats(self.author).follower_count, 0)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import follow_graph
+from ..follow_graph import IntSet
+from ..models import Follow
+
+User = get_user_model()
+
+
+class IntSetTests(TestCase):
+    def test_membership_and_updates(self):
+        ids = IntSet([5, 1, 3, 3])
+        self.assertEqual(list(ids), [1, 3, 5])
+        ids.add(4)
+        ids.add(4)
+        ids.discard(1)
+        ids.discard(2)
+        self.assertEqual(list(ids), [3, 4, 5])
+        self.assertIn(4, ids)
+        self.assertNotIn(6, ids)
+        restored = IntSet.from_bytes(ids.to_bytes())
+        self.assertEqual(list(restored), [3, 4, 5])
+
+
+class FollowGraphTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def fresh_reader(self):
+        return User.objects.get(pk=self.reader.pk)
+
+    def test_follow_checks_are_cached(self):
+        follow_graph.following(self.fresh_reader())
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_graph.is_following(reader, self.author.pk)
+            )
+
+    def test_follow_and_unfollow_update_cached_set(self):
+        follow_graph.following(self.fresh_reader())
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        follow_graph.following(self.fresh_reader())
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(reader, self.author.pk))
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertTrue(response.context['following'])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(
+            follow_graph.is_following(self.fresh_reader(), self.author.pk)
+        )
+
+    def test_set_read_before_follow_is_not_used(self):
+        key = follow_graph._key(self.reader.pk)
+        Follow.objects.create(user=self.reader, author=self.author)
+        # Чтение, начатое до фиксации, кладёт в кэш старый набор.
+        cache.set(key, IntSet().to_bytes())
+        self.assertTrue(
+            follow_graph.is_following(self.fresh_reader(), self.author.pk)
+        )
+
+    def test_followed_by_filter(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        template = Template(
+            '{% load post_cards %}{{ author_id|followed_by:user }}'
+        )
+        rendered = template.render(Context({
+            'author_id': self.author.pk, 'user': self.fresh_reader()
+        }))
+        self.assertEqual(rendered, 'True')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -27,6 +28,7 @@ class PostFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        cls.digest = hashlib.sha256(small_gif).hexdigest()
         cls.uploaded = SimpleUploadedFile(
             name='small.gif',
             content=small_gif,
@@ -79,7 +81,10 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(group.title, form_data['group'])
-        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertEqual(
+            post.image.name,
+            f'posts/{self.digest[:2]}/{self.digest}.gif'
+        )
 
     def test_edit_post(self):
         post_count = Post.objects.count()
@@ -0,0 +1,151 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from .. import images
+from ..forms import PostForm
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def upload(name='photo.jpg', size=(300, 200), mode='RGB', exif=None):
+    content = io.BytesIO()
+    image = Image.new(mode, size, 'teal')
+    if exif is not None:
+        image.save(content, 'JPEG', exif=exif)
+    else:
+        image.save(content, 'PNG' if mode == 'RGBA' else 'JPEG')
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+def rotated_exif():
+    exif = Image.Exif()
+    exif[ORIENTATION] = ROTATED_90
+    return exif.tobytes()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    def form(self, image):
+        return PostForm({'text': 'Пост'}, {'image': image})
+
+    def test_upload_is_rotated_stripped_and_recorded(self):
+        client = Client()
+        client.force_login(self.user)
+        client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост', 'image': upload(exif=rotated_exif())}
+        )
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (200, 300))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertLess(len(post.image_placeholder), 1000)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'width="200" height="300"')
+        self.assertContains(response, post.image_placeholder)
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (200, 300))
+            self.assertNotIn('exif', stored.info)
+            self.assertTrue(stored.info.get('progressive'))
+
+    def test_repeated_upload_is_not_reencoded(self):
+        client = Client()
+        client.force_login(self.user)
+        content = upload().read()
+        with mock.patch(
+            'posts.images.normalize', wraps=images.normalize
+        ) as normalize:
+            for name in ('first.jpg', 'second.jpg'):
+                client.post(reverse('posts:post_create'), {
+                    'text': 'Пост',
+                    'image': SimpleUploadedFile(name, content),
+                })
+        self.assertEqual(normalize.call_count, 1)
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual(second.image.name, first.image.name)
+        for field in ('image_width', 'image_height', 'image_placeholder'):
+            self.assertEqual(getattr(second, field), getattr(first, field))
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_dimensions_are_capped(self):
+        form = self.form(upload(size=(400, 100)))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            (form.instance.image_width, form.instance.image_height),
+            (100, 25)
+        )
+
+    def test_transparency_is_kept_as_png(self):
+        form = self.form(upload('logo.png', mode='RGBA'))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['image'].name, 'logo.png')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=300 * 200 - 1)
+    def test_too_many_pixels_rejected_before_decode(self):
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            form = self.form(upload())
+            self.assertFalse(form.is_valid())
+        load.assert_not_called()
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(POST_IMAGE_MAX_SIZE=10)
+    def test_too_large_file_rejected(self):
+        form = self.form(upload())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
+
+    def test_truncated_image_rejected(self):
+        image = upload()
+        truncated = SimpleUploadedFile(
+            'broken.jpg', image.read()[:image.size // 2]
+        )
+        form = self.form(truncated)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'invalid_image')
+
+    def test_only_cards_below_the_first_are_lazy(self):
+        for color in ('red', 'blue', 'green'):
+            content = io.BytesIO()
+            Image.new('RGB', (30, 20), color).save(content, 'JPEG')
+            Post.objects.create(
+                author=self.user,
+                text='Пост',
+                image=SimpleUploadedFile('photo.jpg', content.getvalue())
+            )
+        client = Client()
+        for _ in range(2):
+            html = client.get(reverse('posts:index')).content.decode()
+            first, *rest = html.split('<img class="card-img')[1:]
+            self.assertNotIn('loading="lazy"', first.split('>')[0])
+            for card in rest:
+                self.assertIn('loading="lazy"', card.split('>')[0])
+            # Вторая карточка, уже закэшированная, становится первой.
+            Post.objects.latest('pk').delete()
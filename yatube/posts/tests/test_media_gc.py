@@ -0,0 +1,141 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail.helpers import serialize
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import thumbnail_kvstore
+from core.models import StoredFile
+
+from ..media_gc import kvstore_images, merge, walk
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def upload(color):
+    content = io.BytesIO()
+    Image.new('RGB', (40, 20), color).save(content, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', content.getvalue())
+
+
+def files(directory):
+    return {name for name, _ in walk(TEMP_MEDIA_ROOT, directory)}
+
+
+class MergeTests(TestCase):
+    def test_walk_matches_string_order(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for name in ('top/a/b', 'top/a.gif', 'top/a-c', 'top/b'):
+            os.makedirs(os.path.dirname(os.path.join(root, name)),
+                        exist_ok=True)
+            open(os.path.join(root, name), 'w').close()
+        names = [name for name, _ in walk(root, 'top')]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 4)
+
+    def test_merge_marks_missing_sides(self):
+        merged = merge(
+            [('a', 1), ('b', 2), ('d', 4)], [('b', 0), ('b', 0), ('c', 0)]
+        )
+        self.assertEqual(
+            [(name, left is not None, right is not None)
+             for name, left, right in merged],
+            [('a', True, False), ('b', True, True),
+             ('c', False, True), ('d', True, False)]
+        )
+
+    def test_merge_rejects_unsorted_stream(self):
+        with self.assertRaises(ValueError):
+            list(merge([('b', 1), ('a', 2)], []))
+
+    def test_kvstore_images_sorted_by_decoded_name(self):
+        names = ['posts/gen_0.jpg', 'posts/фото.jpg', 'posts/a b.jpg',
+                 'posts/a.jpg', 'posts/"q".jpg', 'posts/a.jpg.webp']
+        KVStoreModel.objects.bulk_create(
+            KVStoreModel(
+                key=add_prefix(str(number), 'image'),
+                value=serialize({'name': name, 'size': [40, 20]})
+            )
+            for number, name in enumerate(names)
+        )
+        self.assertEqual(
+            [name for name, _ in kvstore_images('posts')], sorted(names)
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnail_kvstore.lru.clear()
+        author = User.objects.create_user(username='author')
+        self.kept = Post.objects.create(
+            author=author, text='Пост', image=upload('teal')
+        )
+        replaced = Post.objects.create(
+            author=author, text='Пост', image=upload('red')
+        )
+        self.replaced_name = replaced.image.name
+        replaced.image = upload('blue')
+        replaced.save()
+        deleted = Post.objects.create(
+            author=author, text='Пост', image=upload('green')
+        )
+        self.deleted_name = deleted.image.name
+        deleted.delete()
+        self.kept.refresh_from_db()
+        self.referenced = set(
+            Post.objects.values_list('image', flat=True)
+        )
+
+    def collect(self, **options):
+        call_command('collect_media', grace=0, stdout=io.StringIO(),
+                     **options)
+
+    def test_dry_run_keeps_everything(self):
+        images, thumbnails = files('posts'), files('cache')
+        entries = KVStoreModel.objects.count()
+        self.collect(dry_run=True)
+        self.assertEqual(files('posts'), images)
+        self.assertEqual(files('cache'), thumbnails)
+        self.assertEqual(KVStoreModel.objects.count(), entries)
+
+    def test_orphans_are_deleted(self):
+        thumbnails = files('cache')
+        self.collect()
+        self.assertLess(files('cache'), thumbnails)
+        self.assertEqual(files('posts'), self.referenced)
+        self.assertFalse(StoredFile.objects.filter(
+            name__in=[self.replaced_name, self.deleted_name]
+        ).exists())
+        names = {
+            value.split('"')[3]
+            for value in KVStoreModel.objects.filter(
+                key__contains='||image||'
+            ).values_list('value', flat=True)
+        }
+        self.assertEqual(names, self.referenced | files('cache'))
+        card = self.kept.thumbnail_urls['card']
+        self.assertIn(card[len(settings.MEDIA_URL):], files('cache'))
+
+    def test_young_files_are_kept(self):
+        call_command('collect_media', stdout=io.StringIO())
+        self.assertIn(self.deleted_name, files('posts'))
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginator import CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='name')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}')
+            for i in range(settings.COUNT_POSTS * 2 + 3)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_pages_walk_forward_and_back(self):
+        paginator = CursorPaginator(Post.objects.all(), settings.COUNT_POSTS)
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        first = paginator.page()
+        self.assertIsNone(first.previous_cursor)
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertIsNone(third.next_cursor)
+        self.assertEqual(
+            list(first) + list(second) + list(third),
+            expected
+        )
+        self.assertEqual(
+            list(paginator.page(third.previous_cursor)),
+            list(second)
+        )
+        self.assertEqual(
+            list(paginator.page(second.previous_cursor)),
+            list(first)
+        )
+
+    def test_page_query_count_does_not_depend_on_depth(self):
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(url, {'cursor': cursor})
+        cursor = response.context['page_obj'].next_cursor
+        with self.assertNumQueries(1):
+            CursorPaginator(
+                Post.objects.all(), settings.COUNT_POSTS
+            ).page(cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.COUNT_POSTS
+        )
+        self.assertIsNone(response.context['page_obj'].previous_cursor)
@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from core.query_budget import (
+    QueryBudgetExceeded, check_queries, query_shape
+)
+from ..management.commands.index_advisor import Command as IndexAdvisor
+from ..models import Comment, Follow, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='first',
+            description='Тестовое описание'
+        )
+        cls.authors = []
+        cls.post = None
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def add_data(self, authors):
+        for i in range(authors):
+            author = User.objects.create_user(
+                username=f'author_{len(self.authors)}',
+                first_name='Имя',
+                last_name='Фамилия'
+            )
+            self.authors.append(author)
+            Follow.objects.create(user=self.user, author=author)
+            for _ in range(3):
+                self.post = Post.objects.create(
+                    author=author,
+                    group=self.group,
+                    text='Тестовый текст'
+                )
+                Comment.objects.create(
+                    post=self.post,
+                    author=author,
+                    text='Тестовый комментарий'
+                )
+
+    def get_urls(self):
+        author = self.post.author.username
+        return {
+            'index': (reverse('posts:index'), None),
+            'group_list': (
+                reverse('posts:group_list', args=[self.group.slug]), None
+            ),
+            'profile': (reverse('posts:profile', args=[author]), None),
+            'post_detail': (
+                reverse('posts:post_detail', args=[self.post.pk]), None
+            ),
+            'follow_index': (reverse('posts:follow_index'), None),
+            'post_create': (
+                reverse('posts:post_create'), {'text': 'Новый пост'}
+            ),
+            'post_edit': (
+                reverse('posts:post_edit', args=[self.post.pk]), None
+            ),
+            'add_comment': (
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': 'Комментарий'}
+            ),
+            'profile_follow': (
+                reverse('posts:profile_follow', args=[author]), None
+            ),
+            'profile_unfollow': (
+                reverse('posts:profile_unfollow', args=[author]), None
+            ),
+        }
+
+    def query_counts(self):
+        counts = {}
+        for name, (url, data) in self.get_urls().items():
+            with self.subTest(view=name):
+                with CaptureQueriesContext(connection) as queries:
+                    if data is None:
+                        self.authorized_client.get(url)
+                    else:
+                        self.authorized_client.post(url, data)
+                counts[name] = len(queries)
+        return counts
+
+    def test_views_fit_budget_as_data_grows(self):
+        self.add_data(2)
+        small = self.query_counts()
+        self.add_data(10)
+        large = self.query_counts()
+        for name in ('index', 'group_list', 'profile', 'follow_index'):
+            with self.subTest(view=name):
+                self.assertEqual(small[name], large[name])
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+    def test_post_with_image_and_group_fits_budget(self):
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        content = BytesIO()
+        Image.new('RGB', (1600, 900), 'teal').save(content, 'JPEG')
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'group': self.group.pk,
+            'image': SimpleUploadedFile('photo.jpg', content.getvalue()),
+        })
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertIn('card', post.thumbnail_urls)
+
+    def test_repeated_query_shape_is_reported(self):
+        queries = [
+            {'sql': f'SELECT * FROM "auth_user" WHERE "id" = {pk}'}
+            for pk in range(5)
+        ]
+        problems = check_queries('posts:index', queries, budget=10)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('N+1', problems[0])
+
+    def test_over_budget_view_fails(self):
+        self.add_data(1)
+        with override_settings(QUERY_BUDGET_REPEAT_LIMIT=0):
+            with self.assertRaises(QueryBudgetExceeded):
+                Client().get(reverse('posts:index'))
+
+
+class IndexAdvisorTests(TestCase):
+    def test_views_need_no_new_indexes(self):
+        out = StringIO()
+        call_command('index_advisor', '--posts', '50', stdout=out)
+        self.assertNotIn('Предлагаемые индексы', out.getvalue())
+        self.assertNotIn('TEMP B-TREE', out.getvalue())
+
+    def test_temp_sort_without_order_by_is_reported(self):
+        sql = (
+            'SELECT "posts_post"."author_id", COUNT("posts_post"."id") '
+            'FROM "posts_post" GROUP BY "posts_post"."author_id"'
+        )
+        out = StringIO()
+        IndexAdvisor(stdout=out).report({query_shape(sql): {
+            'sql': sql,
+            'urls': {'/'},
+            'plan': ['SCAN posts_post', 'USE TEMP B-TREE FOR GROUP BY'],
+            'scans': set(),
+            'sorts': ['USE TEMP B-TREE FOR GROUP BY'],
+            'partial': set(),
+        }}, verbose=False)
+        self.assertIn('USE TEMP B-TREE FOR GROUP BY', out.getvalue())
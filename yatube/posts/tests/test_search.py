@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..search import SearchPaginator
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='name')
+        cls.group = Group.objects.create(
+            title='Путешествия',
+            slug='travel',
+            description='Заметки о поездках'
+        )
+        cls.mountains = Post.objects.create(
+            author=cls.user,
+            text='Ходили в горы, ночевали в палатке',
+            group=cls.group
+        )
+        cls.sea = Post.objects.create(
+            author=cls.user,
+            text='Тёплое море и долгие прогулки'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        return list(SearchPaginator(query, 10).page())
+
+    def test_stemmer(self):
+        for word, expected in (
+            ('горы', 'гор'),
+            ('прогулками', 'прогулк'),
+            ('ёлки', 'елк'),
+            ('путешествиях', 'путешеств'),
+        ):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_word_forms_are_found(self):
+        self.assertEqual(self.search('гора'), [self.mountains])
+        self.assertEqual(self.search('теплом морем'), [self.sea])
+        self.assertEqual(self.search('прогулка горы'), [])
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_group_text_is_indexed(self):
+        self.assertEqual(self.search('путешествие'), [self.mountains])
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Походы'
+        group.save()
+        self.assertEqual(self.search('путешествие'), [])
+        self.assertEqual(self.search('поход'), [self.mountains])
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.get(pk=self.sea.pk)
+        post.text = 'Холодное озеро'
+        post.save()
+        self.assertEqual(self.search('море'), [])
+        self.assertEqual(self.search('озеро'), [post])
+        post.delete()
+        self.assertEqual(self.search('озеро'), [])
+
+    def test_text_outranks_group_and_cursor_walks_results(self):
+        other = Post.objects.create(author=self.user, text='Поездки на юг')
+        paginator = SearchPaginator('поездка', 1)
+        first = paginator.page()
+        self.assertEqual(list(first), [other])
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(second), [self.mountains])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(list(paginator.page(second.previous_cursor)), [other])
+        self.assertEqual(paginator.count, 2)
+
+    def test_search_page(self):
+        response = self.guest_client.get(
+            reverse('posts:search'),
+            {'q': 'горы'}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.mountains])
+        self.assertEqual(response.context['query'], 'горы')
@@ -0,0 +1,141 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.engines import pil_engine
+
+from core import jobs, thumbnail_kvstore
+
+from .. import thumbnails
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name='small.gif'):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+
+def upload_jpeg(name='wide.jpg', size=(1200, 400)):
+    content = io.BytesIO()
+    Image.new('RGB', size, 'teal').save(content, 'JPEG')
+    return SimpleUploadedFile(
+        name, content.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        thumbnail_kvstore.lru.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_upload_stores_thumbnail_urls(self):
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'С картинкой', 'image': upload()}
+        )
+        jobs.work('test', once=True)
+        post = Post.objects.get()
+        card = post.thumbnail_urls['card']
+        self.assertTrue(card.startswith(settings.MEDIA_URL))
+        self.assertNotEqual(card, post.image.url)
+        with CaptureQueriesContext(connection) as captured:
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(response, card)
+        self.assertFalse(any(
+            'thumbnail_kvstore' in query['sql'] for query in captured
+        ))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_original_is_shown_until_worker_runs(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload()
+        )
+        self.assertEqual(post.thumbnail_urls, {})
+        self.assertContains(Client().get(reverse('posts:index')),
+                            post.image.url)
+        jobs.work('test', once=True)
+        post.refresh_from_db()
+        self.assertIn('card', post.thumbnail_urls)
+        self.assertContains(Client().get(reverse('posts:index')),
+                            post.thumbnail_urls['card'])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_replaced_image_hides_old_thumbnails(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload()
+        )
+        jobs.work('test', once=True)
+        post.refresh_from_db()
+        old_card = post.thumbnail_urls['card']
+        post.image = upload_jpeg('other.jpg')
+        post.save()
+        self.assertEqual(post.thumbnail_urls, {})
+        jobs.work('test', once=True)
+        post.refresh_from_db()
+        self.assertNotEqual(post.thumbnail_urls['card'], old_card)
+
+    def test_missing_file_is_skipped(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image='posts/missing.gif'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_urls, {})
+
+    @override_settings(JOBS_EAGER=False)
+    def test_variants_are_cut_from_single_decode(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload_jpeg()
+        )
+        decode = pil_engine.Engine.get_image
+        with mock.patch.object(pil_engine.Engine, 'get_image',
+                               autospec=True, side_effect=decode) as get:
+            jobs.work('test', once=True)
+        post.refresh_from_db()
+        decoded = [call[0][1].name for call in get.call_args_list]
+        self.assertEqual(decoded.count(post.image.name), 1)
+        srcset = post.thumbnail_urls['card_jpeg_srcset']
+        self.assertEqual(
+            [entry.split()[1] for entry in srcset.split(', ')],
+            ['480w', '720w', '960w']
+        )
+        self.assertEqual(
+            'card_webp_srcset' in post.thumbnail_urls,
+            'WEBP' in thumbnails.formats()
+        )
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, f'srcset="{srcset}"')
+        self.assertContains(response, 'sizes="(min-width: 992px) 960px')
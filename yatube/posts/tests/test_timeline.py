@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост'
+        )
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        entry = TimelineEntry.objects.filter(user=self.user).first()
+        self.assertEqual(entry.post, post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.author).exists()
+        )
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_popular_author_is_pulled_and_merged(self):
+        regular = User.objects.create_user(username='regular')
+        Follow.objects.create(user=self.user, author=regular)
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='second_reader'),
+            author=self.author
+        )
+        regular_post = Post.objects.create(author=regular, text='Push')
+        popular_post = Post.objects.create(author=self.author, text='Pull')
+        self.assertTrue(
+            TimelineEntry.objects.filter(post=regular_post).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=popular_post).exists()
+        )
+        self.assertEqual(
+            list(timeline.feed(self.user).page()),
+            [popular_post, regular_post, self.old_post]
+        )
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_author_below_threshold_is_pushed_again(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        reader = User.objects.create_user(username='second_reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.author).exists()
+        )
+        post = Post.objects.create(author=self.author, text='Pull')
+        follow.delete()
+        self.assertEqual(
+            list(timeline.feed(reader).page()),
+            [post, self.old_post]
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
@@ -1,11 +1,15 @@
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date
 
 
 from ..models import Group, Post, Comment, Follow
@@ -172,3 +176,214 @@ class PostViewsTests(TestCase):
         )
         unfollow_context = response_unfollow.context
         self.assertEqual(len(unfollow_context['page_obj']), 0)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='card_author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Исходный текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_card_is_cached_until_post_changes(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        self.assertContains(self.guest_client.get(url), 'Исходный текст')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertContains(self.guest_client.get(url), 'Новый текст')
+
+    def test_card_is_rerendered_after_author_rename(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        self.assertContains(self.guest_client.get(url), 'Переименованный')
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='page_author')
+        cls.group = Group.objects.create(
+            title='Первая группа',
+            slug='page-first',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Вторая группа',
+            slug='page-second',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_new_post_expires_only_its_pages(self):
+        first_group = reverse('posts:group_list', args=[self.group.slug])
+        second_group = reverse(
+            'posts:group_list', args=[self.other_group.slug]
+        )
+        for url in (reverse('posts:index'), first_group, second_group):
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=User.objects.create_user(username='other'),
+            text='Пост во второй группе',
+            group=self.other_group
+        )
+        self.assertIsNone(self.guest_client.get(first_group).context)
+        self.assertIsNotNone(self.guest_client.get(second_group).context)
+        self.assertIsNotNone(
+            self.guest_client.get(reverse('posts:index')).context
+        )
+
+    def test_comment_expires_post_page(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.guest_client.get(url)
+        self.assertIsNone(self.guest_client.get(url).context)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.assertContains(self.guest_client.get(url), 'Комментарий')
+
+    def test_renamed_author_and_group_expire_old_pages(self):
+        profile = reverse('posts:profile', args=[self.user.username])
+        group = reverse('posts:group_list', args=[self.group.slug])
+        for url in (profile, group):
+            self.guest_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed_author'
+        user.save()
+        renamed = Group.objects.get(pk=self.group.pk)
+        renamed.slug = 'page-renamed'
+        renamed.save()
+        for url in (profile, group):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code,
+                    HTTPStatus.NOT_FOUND
+                )
+
+    def test_post_page_shows_renamed_author_and_group(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.guest_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Переименованный'
+        user.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Переименованный')
+        self.assertContains(response, 'Новое название')
+
+    def test_renamed_group_expires_member_profiles(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        self.guest_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'page-moved'
+        group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['page-moved'])
+        )
+
+    def test_deleted_author_and_group_expire_pages(self):
+        user = User.objects.create_user(username='no_posts')
+        deleted = Group.objects.create(title='Удаляемая', slug='page-gone')
+        profile = reverse('posts:profile', args=[user.username])
+        group = reverse('posts:group_list', args=[deleted.slug])
+        for url in (profile, group):
+            self.guest_client.get(url)
+        user.delete()
+        deleted.delete()
+        for url in (profile, group):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code,
+                    HTTPStatus.NOT_FOUND
+                )
+
+    def test_previous_page_depends_on_new_posts(self):
+        for number in range(settings.COUNT_POSTS):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        index = reverse('posts:index')
+        second = self.guest_client.get(index).context['page_obj']
+        second = self.guest_client.get(
+            f'{index}?cursor={second.next_cursor}'
+        ).context['page_obj']
+        previous = f'{index}?cursor={second.previous_cursor}'
+        self.guest_client.get(previous)
+        Post.objects.create(author=self.user, text='Свежий пост')
+        self.assertIsNotNone(self.guest_client.get(previous).context)
+
+    def test_authorized_pages_are_not_cached(self):
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        url = reverse('posts:index')
+        authorized_client.get(url)
+        self.assertIsNotNone(authorized_client.get(url).context)
+
+    def test_unchanged_pages_answer_not_modified(self):
+        urls = (
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        etags = {}
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etags[url] = response['ETag']
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_renamed_author_is_not_answered_by_date(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        self.guest_client.get(url)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600)
+        )
+        self.assertContains(response, 'Переименованный')
+
+    def test_group_rename_changes_member_profile_etag(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        etag = self.guest_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'page-etag'
+        group.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['page-etag'])
+        )
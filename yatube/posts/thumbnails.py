@@ -0,0 +1,149 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.thumbnail_engine import single_decode
+
+from . import fragments, page_cache
+from .models import Post
+
+
+REBUILD_BATCH_SIZE = 100
+
+
+def formats():
+    """Форматы вариантов; WebP — если Pillow собран с его поддержкой."""
+    return [
+        format_ for format_ in settings.POST_THUMBNAIL_FORMATS
+        if format_ != 'WEBP' or features.check('webp')
+    ]
+
+
+def variants(geometry, source_width):
+    """Ширины и геометрии вариантов размера с его пропорциями.
+
+    Шире исходника варианты не делаются: увеличение только добавит
+    байтов. Ширина самого размера остаётся всегда.
+    """
+    width, height = map(int, geometry.split('x'))
+    for variant in sorted(set(settings.POST_THUMBNAIL_WIDTHS) | {width}):
+        if variant <= source_width or variant == width:
+            yield variant, f'{variant}x{round(height * variant / width)}'
+
+
+def generate(image, size=(None, None), prefetched=False):
+    """Готовит все размеры из POST_THUMBNAIL_SIZES, возвращает их адреса.
+
+    Для каждого размера, кроме адреса основной миниатюры, сохраняются
+    строки srcset в каждом формате: ``card_jpeg_srcset`` и т. п. Все
+    варианты нарезаются из одного декодирования исходника.
+
+    Файла может не быть (удалён, не загрузился или путь ведёт за
+    пределы хранилища), тогда адресов нет. Записи sorl о картинке
+    читаются заранее одной пачкой, если их не прочитал вызывающий.
+    Известный ``size`` исходника избавляет от его декодирования, когда
+    все миниатюры уже готовы.
+    """
+    try:
+        if not image or not image.storage.exists(image.name):
+            return {}
+    except SuspiciousFileOperation:
+        return {}
+    if not prefetched:
+        default.kvstore.prefetch([image])
+    urls = {}
+    with single_decode():
+        source = ImageFile(image)
+        if all(size):
+            source.set_size(size)
+        source_width = default.kvstore.get_or_set(source).width
+        for name, (geometry, options) in settings.POST_THUMBNAIL_SIZES.items():
+            urls[name] = get_thumbnail(image, geometry, **options).url
+            for format_ in formats():
+                urls[f'{name}_{format_.lower()}_srcset'] = ', '.join(
+                    '{} {}w'.format(
+                        get_thumbnail(
+                            image, variant_geometry, format=format_, **options
+                        ).url,
+                        variant
+                    )
+                    for variant, variant_geometry
+                    in variants(geometry, source_width)
+                )
+    return urls
+
+
+def dump(image, urls):
+    return json.dumps({'source': image.name, 'urls': urls})
+
+
+def store(post_id):
+    """Сохраняет адреса миниатюр в строке поста и сбрасывает её кэши.
+
+    Картинки хранятся по хэшу содержимого, поэтому у повторно
+    загруженного файла миниатюры берутся готовыми у другого поста.
+    Запись идёт только если картинка не сменилась, пока их готовили.
+    """
+    post = (Post
+            .objects
+            .select_related('author')
+            .filter(pk=post_id)
+            .exclude(image='')
+            .first())
+    if post is None:
+        return
+    stored = (Post
+              .objects
+              .filter(image=post.image.name)
+              .exclude(pk=post_id)
+              .exclude(thumbnails='')
+              .values_list('thumbnails', flat=True)
+              .first())
+    if stored is None:
+        urls = generate(post.image, (post.image_width, post.image_height))
+        if not urls:
+            return
+        stored = dump(post.image, urls)
+    with transaction.atomic():
+        # Страница изменилась: условные GET не должны отвечать 304
+        # с исходной картинкой, поэтому сдвигается и updated.
+        updated = (Post
+                   .objects
+                   .filter(pk=post_id, image=post.image.name)
+                   .update(thumbnails=stored, updated=timezone.now()))
+        if updated:
+            fragments.bump('post', post_id)
+            page_cache.expire_post(post, created=False)
+
+
+def rebuild_all():
+    """Миниатюры для всех постов, например после bulk_create.
+
+    Одна картинка бывает у многих постов, поэтому размеры готовятся
+    один раз на файл и пишутся одним UPDATE.
+    """
+    images = (Post
+              .objects
+              .exclude(image='')
+              .order_by()
+              .values_list('image', 'image_width', 'image_height')
+              .distinct())
+    rows = list(images)
+    for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+        batch = [
+            (Post(image=name).image, (width, height))
+            for name, width, height in rows[start:start + REBUILD_BATCH_SIZE]
+        ]
+        default.kvstore.prefetch([image for image, _ in batch])
+        for image, size in batch:
+            urls = generate(image, size, prefetched=True)
+            if urls:
+                Post.objects.filter(image=image.name).update(
+                    thumbnails=dump(image, urls)
+                )
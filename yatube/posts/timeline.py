@@ -0,0 +1,180 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import CursorPaginator, MergedCursorPaginator
+
+
+def is_pulled(author_id):
+    """Популярных авторов не раскладываем по лентам, а читаем при запросе."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        follower_count__gt=settings.FEED_PULL_THRESHOLD
+    ).exists()
+
+
+def pulled_authors(user):
+    """Авторы из подписок пользователя, которые читаются в режиме pull."""
+    return list(UserStats
+                .objects
+                .filter(
+                    user__following__user=user,
+                    follower_count__gt=settings.FEED_PULL_THRESHOLD
+                )
+                .values_list('user_id', flat=True))
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = (Follow
+                 .objects
+                 .filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_pulled(author_id):
+        return
+    posts = (Post
+             .objects
+             .filter(author_id=author_id)
+             .order_by('-pub_date', '-pk')
+             .values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL])
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date
+            )
+            for post_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def _fill(cursor, author_id):
+    """Раскладывает последние посты автора по лентам его подписчиков
+    одним INSERT ... SELECT."""
+    qn = connection.ops.quote_name
+    entry, follow, post = (
+        qn(model._meta.db_table) for model in (TimelineEntry, Follow, Post)
+    )
+    cursor.execute(
+        f'INSERT INTO {entry} (user_id, post_id, author_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+        f'FROM {follow} f JOIN ('
+        f'  SELECT id, author_id, pub_date FROM {post}'
+        f'  WHERE author_id = %s'
+        f'  ORDER BY pub_date DESC, id DESC LIMIT %s'
+        f') p ON p.author_id = f.author_id',
+        [author_id, settings.TIMELINE_BACKFILL]
+    )
+
+
+def rebuild_all():
+    """Заново раскладывает ленты, например после bulk_create без сигналов.
+
+    Режим автора берётся из счётчиков, поэтому их нужно пересчитать
+    раньше.
+    """
+    authors = list(UserStats
+                   .objects
+                   .filter(
+                       follower_count__gt=0,
+                       follower_count__lte=settings.FEED_PULL_THRESHOLD
+                   )
+                   .values_list('user_id', flat=True))
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.all().delete()
+        for author_id in authors:
+            _fill(cursor, author_id)
+
+
+def rebuild_author(author_id):
+    """Переводит ленты подписчиков автора в его текущий режим.
+
+    Пока автор читался через pull, его новые посты в ленты не
+    попадали: вернувшись в push, он раскладывается заново. Записи
+    автора, ушедшего в pull, больше не читаются и удаляются.
+    """
+    pulled = is_pulled(author_id)
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+        if not pulled:
+            _fill(cursor, author_id)
+
+
+def crossed_threshold(author_id, delta):
+    """Перешёл ли автор порог pull после изменения числа подписчиков
+    на ``delta``."""
+    boundary = settings.FEED_PULL_THRESHOLD + (1 if delta > 0 else 0)
+    return UserStats.objects.filter(
+        user_id=author_id, follower_count=boundary
+    ).exists()
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсор по записям ленты, отдающий сами посты."""
+
+    def __init__(self, entries, per_page):
+        super().__init__(entries, per_page, key=('pub_date', 'post_id'))
+
+    def item_key(self, post):
+        return post.pub_date, post.pk
+
+    def fetch_after(self, key):
+        return [entry.post for entry in super().fetch_after(key)]
+
+    def fetch_before(self, key):
+        return [entry.post for entry in super().fetch_before(key)]
+
+
+def feed(user, per_page=None):
+    """Лента подписок пользователя.
+
+    Посты обычных авторов читаются одним диапазоном индекса по
+    материализованной ленте, посты популярных авторов (pull) выбираются
+    при запросе и сливаются с ней по ключу (pub_date, id).
+    """
+    per_page = per_page or settings.COUNT_POSTS
+    pulled = pulled_authors(user)
+    entries = (TimelineEntry
+               .objects
+               .filter(user=user)
+               .exclude(author_id__in=pulled)
+               .select_related('post__author', 'post__group'))
+    pushed = TimelinePaginator(entries, per_page)
+    if not pulled:
+        return pushed
+    posts = (Post
+             .objects
+             .filter(author_id__in=pulled)
+             .select_related('author', 'group'))
+    return MergedCursorPaginator(
+        [pushed, CursorPaginator(posts, per_page)],
+        per_page
+    )
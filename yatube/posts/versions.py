@@ -0,0 +1,32 @@
+import time
+
+from django.core.cache import cache
+
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def bump(*keys):
+    """Сдвигает счётчики версий: всё, что закэшировано под старыми
+    версиями, больше не читается."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def get_many(keys):
+    """Текущие версии одним чтением кэша.
+
+    Версия, вытесненная из кэша, заводится заново от текущего времени,
+    чтобы не совпасть со старыми закэшированными значениями.
+    """
+    keys = set(keys)
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
@@ -1,25 +1,43 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_http_methods
 
+from core.db.replica import replica_read
+from core.query_budget import query_budget
+
+from . import (
+    conditional, counters, follow_graph, page_cache, search, timeline
+)
 from .models import Group, Post, User, Follow
+from .conditional import conditional_get
 from .forms import CommentForm, PostForm
-from .paginator import paginator
+from .page_cache import cache_anonymous
+from .paginator import CURSOR_PARAM, paginator
 
 
+@replica_read
+@query_budget(3)
+@cache_anonymous(page_cache.index_scopes)
 def index(request):
     post_list = (Post
                  .objects
-                 .prefetch_related())
+                 .select_related('author', 'group'))
     page_obj = paginator(request, post_list)
     return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
+@replica_read
+@query_budget(4)
+@conditional_get(conditional.group_validators)
+@cache_anonymous(page_cache.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = (Post
                  .objects
                  .filter(group=group)
-                 .prefetch_related('group'))
+                 .select_related('author', 'group'))
     page_obj = paginator(request, post_list)
     return render(
         request,
@@ -28,36 +46,49 @@ def group_posts(request, slug):
     )
 
 
+@replica_read
+@query_budget(5)
+@conditional_get(conditional.profile_validators)
+@cache_anonymous(page_cache.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = False
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    following = follow_graph.is_following(request.user, author.pk)
     post_list = (Post
                  .objects
                  .filter(author=author)
-                 .prefetch_related('author'))
+                 .select_related('author', 'group'))
     page_obj = paginator(request, post_list)
     return render(
         request,
         'posts/profile.html',
-        {'author': author, 'page_obj': page_obj, 'following': following}
+        {
+            'author': author,
+            'page_obj': page_obj,
+            'following': following,
+            'post_count': counters.user_stats(author).post_count
+        }
     )
 
 
+@replica_read
+@query_budget(4)
+@conditional_get(conditional.post_validators)
+@cache_anonymous(page_cache.post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_list = (Post
-                 .objects
-                 .filter(author=post.author)
-                 .prefetch_related('author'))
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     return render(
         request,
         'posts/post_detail.html',
         {
-            'post_count': post_list,
+            'post_count': counters.user_stats(post.author).post_count,
             'post': post,
             'form': form,
             'comments': comments
@@ -65,7 +96,22 @@ def post_detail(request, post_id):
     )
 
 
+@query_budget(4)
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search.SearchPaginator(
+        query,
+        settings.COUNT_POSTS
+    ).get_page(request.GET.get(CURSOR_PARAM))
+    return render(
+        request,
+        'posts/search.html',
+        {'query': query, 'page_obj': page_obj}
+    )
+
+
 @login_required
+@query_budget(15)
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -81,6 +127,7 @@ def post_create(request):
 
 
 @login_required
+@query_budget(13)
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -103,6 +150,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@query_budget(8)
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -115,13 +163,12 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(5)
 def follow_index(request):
     title = 'Публикации избранных авторов'
-    post_list = (Post
-                 .objects
-                 .filter(author__following__user=request.user)
-                 .prefetch_related('author__following__user'))
-    page_obj = paginator(request, post_list)
+    page_obj = timeline.feed(request.user).get_page(
+        request.GET.get(CURSOR_PARAM)
+    )
     return render(
         request,
         'posts/follow.html',
@@ -130,22 +177,41 @@ def follow_index(request):
 
 
 @login_required
+@query_budget(12)
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
-    if follow_author != request.user and (
-        not request.user.follower.filter(author=follow_author).exists()
-    ):
-        Follow.objects.create(
-            user=request.user,
-            author=follow_author
-        )
+    if follow_author != request.user:
+        Follow.objects.follow(request.user, follow_author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@query_budget(10)
 def profile_unfollow(request, username):
     follow_author = get_object_or_404(User, username=username)
-    data_follow = request.user.follower.filter(author=follow_author)
-    if data_follow.exists():
-        data_follow.delete()
+    Follow.objects.unfollow(request.user, follow_author)
     return redirect('posts:profile', username)
+
+
+@require_http_methods(['GET', 'POST', 'DELETE'])
+@query_budget(12)
+def profile_following(request, username):
+    """Подписка без перезагрузки профиля: POST подписывает, DELETE
+    отписывает, ответ — состояние подписки и число подписчиков.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'login_required'}, status=401)
+    follow_author = get_object_or_404(User, username=username)
+    if request.method == 'GET':
+        following = follow_graph.is_following(request.user, follow_author.pk)
+    elif request.method == 'POST':
+        following = follow_author != request.user
+        if following:
+            Follow.objects.follow(request.user, follow_author)
+    else:
+        following = False
+        Follow.objects.unfollow(request.user, follow_author)
+    return JsonResponse({
+        'following': following,
+        'followers': counters.user_stats(follow_author).follower_count,
+    })
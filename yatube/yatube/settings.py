@@ -18,6 +18,15 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# core.media.serve отдаёт только эти папки MEDIA_ROOT: картинки постов
+# и миниатюры sorl.
+MEDIA_SERVE_DIRS = ('posts', 'cache')
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# За nginx — 'X-Accel-Redirect' и internal location по MEDIA_ACCEL_PREFIX
+# с alias на MEDIA_ROOT; за Apache/lighttpd — 'X-Sendfile'. Без прокси
+# None: файл отдаёт FileResponse.
+MEDIA_ACCEL_HEADER = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -59,6 +68,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.query_budget.QueryBudgetMiddleware',
+    'core.db.replica.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,11 +108,42 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с WAL и PRAGMA соединения, см. core/db/sqlite3/base.py.
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переиспользуется между запросами, PRAGMA
+        # выполняются один раз на соединение.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+    # Реплика для чтений; локально — копия файла основной базы,
+    # которую обновляет sync_replica или REPLICA_SYNC_INTERVAL.
+    'replica': {
+        'ENGINE': 'core.db.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['core.db.replica.PrimaryReplicaRouter']
+
+# Алиас реплики; view с replica_read читают из неё.
+REPLICA_DATABASE = 'replica'
+
+# Сколько секунд хранится cookie с временем последней записи клиента.
+REPLICA_STICKY_MAX_AGE = 24 * 60 * 60
+
+# Период синхронизации реплики в фоновом потоке процесса, 0 — выключена.
+REPLICA_SYNC_INTERVAL = 0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,8 +179,112 @@ USE_TZ = True
 
 COUNT_POSTS = 10
 
+# Бюджет SQL-запросов view (core.query_budget): проверка включается
+# в отладке, QUERY_BUDGET_RAISE превращает нарушения в исключения,
+# а повтор одной формы запроса больше REPEAT_LIMIT раз считается N+1.
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_REPEAT_LIMIT = 2
+# manage.py test включает проверку с исключениями.
+TEST_RUNNER = 'core.test_runner.QueryBudgetRunner'
+
+# Кэш страниц и карточек сбрасывается сменой версий (posts.versions),
+# и смена должна быть видна всем процессам: воркерам сервера и
+# обработчику задач. LocMemCache у каждого процесса свой, поэтому без
+# DEBUG нужен общий кэш, это проверяет manage.py check --deploy.
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }
+    }
+
+# Время жизни отрендеренных карточек постов (posts.fragments); устаревают
+# они раньше, по смене версии поста, автора или группы.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Страницы для анонимных читателей (posts.page_cache) сбрасываются
+# сигналами моделей, таймаут лишь ограничивает жизнь забытых ключей.
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Набор подписок пользователя (posts.follow_graph) правится на месте
+# после фиксации подписки, таймаут ограничивает жизнь пропущенной правки.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Материализованные ленты подписок: сколько постов автора попадает
+# в ленту при подписке и каким пакетом пишутся записи ленты.
+TIMELINE_BACKFILL = 1000
+TIMELINE_BATCH_SIZE = 500
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, а подмешиваются в ленту при чтении.
+FEED_PULL_THRESHOLD = 1000
+
+# Миниатюры картинок постов (posts.thumbnails): название размера,
+# геометрия и параметры sorl. Готовятся задачей после загрузки.
+POST_THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Каждый размер нарезается ещё и по этим ширинам для srcset, в каждом
+# из форматов; WebP пропускается, если Pillow собран без него.
+POST_THUMBNAIL_WIDTHS = (480, 720, 960, 1440)
+POST_THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+THUMBNAIL_ENGINE = 'core.thumbnail_engine.Engine'
+
+# Картинки постов проверяются по заголовку и перекодируются при загрузке.
+POST_IMAGE_MAX_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 85
+# Большая сторона заглушки, которая видна до загрузки миниатюры.
+POST_IMAGE_PLACEHOLDER_SIDE = 16
+
+# Загрузки хэшируются по мере приёма, картинки постов хранятся по хэшу.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.MemoryFileUploadHandler',
+    'core.uploads.TemporaryFileUploadHandler',
+]
+# Записи sorl читаются через память процесса (core.thumbnail_kvstore):
+# её объём в символах ключей и значений и срок жизни записи в секундах.
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+THUMBNAIL_KVSTORE_LRU_SIZE = 1024 * 1024
+THUMBNAIL_KVSTORE_LRU_TIMEOUT = 5 * 60
+
+# Очередь задач (core.jobs): в отладке задачи выполняются сразу,
+# без обработчика; иначе их выполняет manage.py worker.
+JOBS_EAGER = DEBUG
+JOBS_MAX_ATTEMPTS = 5
+# Пауза перед повтором: JOBS_RETRY_DELAY * 2^(попытка - 1), не больше
+# JOBS_RETRY_MAX_DELAY секунд.
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+# Задача в работе дольше этого срока считается брошенной упавшим
+# обработчиком и забирается снова.
+JOBS_LOCK_TIMEOUT = 10 * 60
+
+# Сборщик мусора collect_media не трогает файлы моложе этого числа секунд.
+MEDIA_GC_GRACE = 24 * 60 * 60
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_collected')
+# Без DEBUG имена статики берутся из манифеста collectstatic: с хэшем
+# содержимого, рядом сжатые копии. При DEBUG runserver отдаёт исходники.
+if DEBUG:
+    STATICFILES_STORAGE = (
+        'django.contrib.staticfiles.storage.StaticFilesStorage'
+    )
+else:
+    STATICFILES_STORAGE = 'core.staticfiles.StaticFilesStorage'
+STATIC_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# Из этих таблиц стилей при collectstatic убираются правила с классами,
+# которых нет в шаблонах и скриптах из STATIC_PURGE_CONTENT.
+STATIC_PURGE_CSS = ('css/bootstrap.min.css',)
+STATIC_PURGE_CONTENT = (TEMPLATES_DIR,) + STATICFILES_DIRS